@@ -10,12 +10,14 @@ from .recursive import *
 from .plotfuncs import *
 from .figaxes import SubPlot, subplot, Plots, plots
 
-from .histogram import histogram
+from .histogram import histogram, histograms, histogramstack, LiveHistogram
+from .datafile import DataFile
 from .distribfit import distribfit
 
 from .correlations import xcorr
 from .polyfit import polyfit, linearfit
-from .binedstatplot import binedstat, ybinedstat, xbinedstat
+from .binedstatplot import (binedstat, ybinedstat, xbinedstat, binedstat2d,
+                            BinedMoments)
 from .statplot import stat
 from .img2data import img2data
 from .specgram import (specgram, magnitude_spectrum, angle_spectrum,
@@ -1,7 +1,8 @@
 from __future__ import division, absolute_import, print_function
 
 from .recursive import (RecObject, RecFunc, CatRecObject, KWS, alias,
-                        _value_formater, _list_formater, rproperty)
+                        _value_formater, _list_formater, rproperty,
+                        _defer_go)
 from .stack import stack
 
 import inspect
@@ -180,6 +181,9 @@ class PlotFactory(RecObject, _Style):
     def goifgo(self):
         go = self.get("go", False)
         if go:
+            if _defer_go(self):
+                # called from a go compute thread
+                return
             if go is True:
                 self["_go_results"] = self.go("-")
                 return
@@ -0,0 +1,134 @@
+""" timings and memory of the binedstat engines against scipy.stats
+
+run with the package importable as smartplotlib:
+    python bench_binedstat.py          # timings
+    python bench_binedstat.py memory   # peak memory, one process per case
+The memory peak is the one of tracemalloc if available (python 3), else
+the peak resident memory.
+"""
+from __future__ import division, absolute_import, print_function
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from scipy.stats import binned_statistic, binned_statistic_2d
+import smartplotlib as sp
+from smartplotlib.binedstatplot import _statbin, _statbin2d
+from bench_histogram import timeit, _anon_mb
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+N = 10**7
+
+def bench_stats():
+    rs = np.random.RandomState(0)
+    x, v = rs.rand(N//10)*100, rs.randn(N//10)
+    for fstat in ["mean", "std"]:
+        timeit("scipy %s 100 bins"%fstat,
+               lambda: binned_statistic(x, v, fstat, 100, (0, 100)))
+        timeit("engine %s 100 bins"%fstat, lambda: _statbin(x, v, fstat, 100, (0, 100)))
+    timeit("3 scipy calls, mean and errors",
+           lambda: [binned_statistic(x, v, f, 100, (0, 100)) for f in ["mean", "std", "count"]])
+    timeit("engine mean and errors",
+           lambda: _statbin(x, v, "mean", 100, (0, 100), binerror=True))
+
+def bench_quantiles():
+    rs = np.random.RandomState(1)
+    x, v = rs.rand(N)*100, rs.randn(N)
+    # scipy sorts the values of each bin in a python loop, 10 times less points
+    timeit("scipy median 1000 bins, 1e6 points",
+           lambda: binned_statistic(x[:N//10], v[:N//10], "median", 1000, (0, 100)))
+    timeit("engine median 1000 bins, 1e6 points",
+           lambda: _statbin(x[:N//10], v[:N//10], "median", 1000, (0, 100)))
+    timeit("engine median 10000 bins", lambda: _statbin(x, v, "median", 10000, (0, 100)))
+    timeit("engine p90 10000 bins", lambda: _statbin(x, v, "p90", 10000, (0, 100)))
+    timeit("sketch median 10000 bins", lambda: _statbin(x, v, "median", 10000, (0, 100),
+                                                        sketch=256))
+
+def bench_2d():
+    rs = np.random.RandomState(2)
+    x, y, z = rs.randn(N//5), rs.randn(N//5), rs.randn(N//5)
+    for fstat in ["mean", "std"]:
+        timeit("scipy 2d %s 200 bins"%fstat, lambda: binned_statistic_2d(x, y, z, fstat, 200))
+        timeit("engine 2d %s 200 bins"%fstat, lambda: _statbin2d(x, y, z, fstat, 200))
+    x, y, z = x[:N//50], y[:N//50], z[:N//50]
+    timeit("scipy 2d median 100 bins", lambda: binned_statistic_2d(x, y, z, "median", 100))
+    timeit("engine 2d median 100 bins", lambda: _statbin2d(x, y, z, "median", 100))
+
+def _peak_mb():
+    """ the peak resident memory, from /proc if possible (ru_maxrss is kB on
+    Linux, bytes on Mac OS)
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM"):
+                    return int(line.split()[1])//1024
+    except IOError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak//2**20 if sys.platform == "darwin" else peak//1024
+
+def memory_case(case, path):
+    """ run one case, print its time, input size, the extra peak memory and
+    the anonymous memory at the end (the peak resident memory counts the
+    pages of the mapped files)
+    """
+    if case == "datafile":
+        data, indexes = sp.DataFile(path), None
+        size = os.path.getsize(path)
+    else:
+        data, indexes = np.load(path+".v.npy"), np.load(path+".x.npy")
+        size = data.nbytes+indexes.nbytes
+    if tracemalloc is not None:
+        tracemalloc.start()
+    base = _peak_mb()
+    t = time.time()
+    if case == "datafile":
+        p = sp.binedstat(data, indexes, fstat="mean", bins=1000, binerror=True)
+    else:
+        p = sp.xyplot(indexes, data).ybinedstat(fstat=case, bins=100)
+    p["y"]
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]//2**20
+    else:
+        peak = _peak_mb()-base
+    print("%-10s %8.3fs input %5d MB extra peak %5d MB anon %5d MB"%(
+          case, time.time()-t, size//2**20, peak, _anon_mb()))
+
+def bench_memory():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "data.f8")
+    mm = np.memmap(path, dtype=float, mode="w+", shape=(2*N,))
+    for i in range(0, mm.size, 10**6):
+        mm[i:i+10**6] = np.random.randn(10**6)
+    mm.flush()
+    del mm
+    rs = np.random.RandomState(3)
+    np.save(path+".x.npy", rs.rand(N))
+    np.save(path+".v.npy", rs.rand(N))
+    try:
+        for case in ["mean", "std", "median", "datafile"]:
+            subprocess.check_call([sys.executable, __file__, "case", case, path])
+    finally:
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["case"]:
+        memory_case(*sys.argv[2:4])
+    elif sys.argv[1:2] == ["memory"]:
+        bench_memory()
+    else:
+        for bench in [bench_stats, bench_quantiles, bench_2d]:
+            bench()
@@ -0,0 +1,144 @@
+""" timings and memory of the histogram engines against numpy
+
+run with the package importable as smartplotlib:
+    python bench_histogram.py          # timings
+    python bench_histogram.py memory   # peak memory, one process per case
+"""
+from __future__ import division, absolute_import, print_function
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import smartplotlib as sp
+from smartplotlib.histogram import (_uniform_histogram, _parallel_histogram,
+                                    _histogram2d_counts, _makebinedstatplot)
+
+N = 10**7
+
+def timeit(label, func, number=1):
+    t = time.time()
+    for i in range(number):
+        func()
+    if number > 1:
+        label = "%d %s"%(number, label)
+    print("%-50s %8.3fs"%(label, time.time()-t))
+
+def bench_uniform():
+    rs = np.random.RandomState(0)
+    for dtype in (np.float64, np.float32):
+        x = rs.randn(N).astype(dtype)
+        for nbins in (100, 1000):
+            name = "%s %d bins"%(np.dtype(dtype).name, nbins)
+            timeit("np.histogram "+name, lambda: np.histogram(x, nbins))
+            timeit("uniform engine "+name, lambda: _uniform_histogram(x, nbins))
+
+def bench_workers():
+    x = np.random.RandomState(1).randn(N)
+    for workers in (1, 2, 4):
+        timeit("1d workers=%d"%workers,
+               lambda: _parallel_histogram(x, 100, (-5, 5), None, workers))
+
+def bench_geometry():
+    d = np.random.RandomState(2).randn(1000)
+    bins = np.linspace(-4, 4, 20001)
+    m = sp.histogram(d, bins=bins)["hist"]
+    def make():
+        _makebinedstatplot(sp.histogram.derive(), m.copy(), bins, None)
+    timeit("binned plots of 20000 bins, geometry not read", make, 1000)
+
+def bench_sumw2():
+    rs = np.random.RandomState(0)
+    x = rs.randn(N)
+    w = rs.rand(N)
+    timeit("2 np.histogram, weights and squared weights",
+           lambda: (np.histogram(x, 100, (-5, 5), weights=w),
+                    np.histogram(x, 100, (-5, 5), weights=w*w)))
+    timeit("histogram with weights and sumw2",
+           lambda: sp.histogram(x, bins=100, range=(-5, 5), weights=w))
+
+def bench_2d():
+    rs = np.random.RandomState(1)
+    x, y = rs.randn(N), rs.randn(N)
+    timeit("np.histogram2d 50 bins", lambda: np.histogram2d(x, y, 50))
+    for workers in (None, 2, 4):
+        timeit("2d workers=%s"%workers,
+               lambda: _histogram2d_counts(x, y, 50, workers=workers))
+
+def _telemetry(n=4*10**6):
+    """ points on a few thousand cells of a 4096x4096 grid """
+    rs = np.random.RandomState(0)
+    cx, cy = rs.randint(0, 4096, 3000), rs.randint(0, 4096, 3000)
+    k = rs.randint(0, 3000, n)
+    return cx[k]+rs.rand(n)*0.9, cy[k]+rs.rand(n)*0.9
+
+def _anon_mb():
+    """ the anonymous resident memory (not the mapped files), Linux only """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon"):
+                    return int(line.split()[1])//1024
+    except IOError:
+        pass
+    return -1
+
+def memory_case(case, path):
+    """ run one case, print its time, the extra peak resident memory and
+    the anonymous memory at the end
+    """
+    if case.startswith("2d"):
+        x, y = np.load(path+".x.npy"), np.load(path+".y.npy")
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t = time.time()
+    if case == "load":
+        sp.histogram(np.fromfile(path), bins=100, range=(-5, 5))
+    elif case == "memmap":
+        sp.histogram(np.memmap(path, dtype=float, mode="r"), bins=100, range=(-5, 5))
+    elif case == "datafile":
+        sp.histogram(sp.DataFile(path), bins=100, range=(-5, 5))
+    elif case == "2d-numpy":
+        np.histogram2d(x, y, 4096, [[0, 4096], [0, 4096]])
+    elif case in ("2d-dense", "2d-sparse"):
+        p = sp.xyplot(x=x, y=y).histogram2d(bins=4096, range=[[0, 4096], [0, 4096]],
+                                             sparse=(case == "2d-sparse"))
+        p["X"], p["Y"], p["hist"]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss-base
+    print("%-30s %8.3fs peak +%5d MB anon %5d MB"%(case, time.time()-t,
+                                                   peak//1024, _anon_mb()))
+
+def bench_memory():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "data.f8")
+    mm = np.memmap(path, dtype=float, mode="w+", shape=(2*N,))
+    for i in range(0, mm.size, 10**6):
+        mm[i:i+10**6] = np.random.randn(10**6)
+    mm.flush()
+    del mm
+    x, y = _telemetry()
+    np.save(path+".x.npy", x)
+    np.save(path+".y.npy", y)
+    del x, y
+    try:
+        for case in ["load", "memmap", "datafile", "2d-numpy", "2d-dense",
+                     "2d-sparse"]:
+            subprocess.check_call([sys.executable, __file__, "case", case, path])
+    finally:
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["case"]:
+        memory_case(*sys.argv[2:4])
+    elif sys.argv[1:2] == ["memory"]:
+        bench_memory()
+    else:
+        for bench in [bench_uniform, bench_workers, bench_sumw2, bench_2d,
+                      bench_geometry]:
+            bench()
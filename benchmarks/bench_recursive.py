@@ -0,0 +1,117 @@
+""" timings of the parameter machinery of recursive
+
+run with the package importable as smartplotlib:
+    python bench_recursive.py
+Each line gives the time of one operation repeated, set RESOLUTION_CACHE to
+False in recursive to compare with the plain hierarchy walk.
+"""
+from __future__ import division, absolute_import, print_function
+
+import gc
+import sys
+import time
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import smartplotlib as sp
+from smartplotlib import recursive as rec
+
+def timeit(label, func, number):
+    t = time.time()
+    for i in range(number):
+        func()
+    print("%-45s %8.3fs"%("%d %s"%(number, label), time.time()-t))
+
+def footprint(make, n=2000):
+    """ the bytes of the new objects made by make() """
+    gc.collect()
+    before = set(id(o) for o in gc.get_objects())
+    keep = [make() for i in range(n)]
+    new = [o for o in gc.get_objects() if id(o) not in before and o is not keep]
+    return sum(sys.getsizeof(o) for o in new)//n
+
+def bench_resolution():
+    p = sp.xyplot
+    for i in range(8):
+        p = p.derive(**{"k%d"%i: i})
+    p = p([1, 2, 3], [1, 2, 3])
+    f = p.plot
+    for flag in (False, True):
+        rec.RESOLUTION_CACHE = flag
+        timeit("p['k0'], cache=%s"%flag, lambda: p["k0"], 20000)
+        timeit("'color' in plot, cache=%s"%flag, lambda: "color" in f, 20000)
+    rec.RESOLUTION_CACHE = True
+
+def bench_paths():
+    p = sp.xyplot([1, 2, 3], [1, 2, 3])
+    p["axes.xaxis|color"] = "red"
+    timeit("p['axes.xaxis|color']", lambda: p["axes.xaxis|color"], 5000)
+    timeit("p['plot|color'] = 'k'", lambda: p.__setitem__("plot|color", "k"), 5000)
+
+def bench_makers():
+    p = sp.xyplot([1, 2, 3], [1, 2, 3])
+    timeit("p.axes.x.get('color')", lambda: p.axes.x.get("color"), 10000)
+
+def bench_footprint():
+    p = sp.xyplot([1, 2, 3], [1, 2, 3])
+    it = sp.xyplot.iter(10**9, color=["r", "b"])
+    for label, make in [("p.axes", lambda: p.axes), ("p.derive()", p.derive),
+                        ("next(iter)", lambda: next(it))]:
+        print("%-45s %8d bytes"%(label, footprint(make)))
+
+def bench_alias():
+    x = np.linspace(0, 10, 1000)
+    p = sp.xyplot(x, x**2).polyfit(npoints=200000)
+    def reads():
+        p["y"]
+        p.plot["x"]
+    rec.alias_stats(reset=True)
+    timeit("polyfit x/y reads", reads, 200)
+    print("%-45s %s"%("alias hits/misses", rec.alias_stats()))
+
+def bench_bulk():
+    import matplotlib.pyplot as plt
+    ax = plt.figure().add_subplot(111)
+    pl = sp.xyplot([], [], axes=ax).plot
+    timeit("plot.getkwargs() + getargs()", lambda: (pl.getkwargs(), pl.getargs()), 2000)
+
+def bench_go():
+    class Sub(rec.RecObject):
+        f = rec.RecFunc().caller(lambda : 1)
+        g = rec.RecFunc().caller(lambda : 2)
+    class G(rec.RecObject):
+        sub = Sub()
+        f = rec.RecFunc().caller(lambda : 3)
+    g = G()
+    g["-init"] = ["f", "sub:f,g"]
+    g["-end"] = ["sub.g; f", "sub|-x"]
+    g.sub["-x"] = ["f"]
+    timeit("go('-init', '-end')", lambda: g.go("-init", "-end"), 5000)
+    plan = rec.compile_go("-init", "-end")
+    timeit("plan(g)", lambda: plan(g), 5000)
+
+def bench_executor():
+    rs = np.random.RandomState(0)
+    x = rs.randn(4*10**6)
+    p = sp.xyplot(x, x+rs.randn(x.size))
+    cmds = ("yhistogram2y", "xhistogram2y", "ybinedstat", "histogram2d", "polyfit")
+    timeit("go of 5 factories, 4e6 points", lambda: p.go(*cmds), 1)
+    for executor in (2, 4):
+        timeit("go of 5 factories, executor=%d"%executor,
+               lambda: p.go(*cmds, executor=executor), 1)
+
+def bench_all():
+    p = sp.xyplot(np.arange(10.), np.arange(10.))
+    s = sp.subplot(111)
+    timeit("plot.derive() + subplot.derive()", lambda: (p.plot.derive(), s.derive()), 3000)
+    timeit("axes.all + lookup", lambda: "color" in p.axes.all, 3000)
+
+def bench_update():
+    params = rec._Params((str(i), i) for i in range(200))
+    timeit("update(a=1, b=2) of 200 parameters", lambda: params.update(a=1, b=2), 100000)
+
+if __name__ == "__main__":
+    for bench in [bench_resolution, bench_paths, bench_makers, bench_footprint,
+                  bench_alias, bench_bulk, bench_go, bench_executor, bench_all,
+                  bench_update]:
+        bench()
@@ -4,13 +4,21 @@ from . import plotfuncs as pfs
 from .recursive import KWS, alias
 from .base import PlotFactory
 import numpy as np
-from .plotclasses import (DataPlot, dataplot, xyplot, XYPlot)
+import six
+from .plotclasses import (DataPlot, dataplot, xyplot, XYPlot,
+                          xyzplot, XYZPlot)
 
 
 
-from .histogram import _makebinedstatplot
+from .histogram import (_makebinedstatplot, _auto_fast_bins, AUTOFAST,
+                        _UniformBins, _bins_index, _uniform_range,
+                        _histogram2d_part, CHUNKSIZE, _is_streamed,
+                        _iter_chunks, _map_chunks, _split_chunks,
+                        _histogram2d_edges, _set_grid, _BLOCKSIZE)
+from .datafile import DataFile
 
-# scipy.stats is imported at the end
+# scipy.stats is imported at the end, it is needed only for the statistics
+# that _BinMoments does not compute (e.g. a user function)
 
 
 ##
@@ -44,6 +52,51 @@ def _stdsmed(value):
 # list of functions handled by binned_statistic
 handled = ["std", "stdmean", "stdmed", "mean", "median", "count", "sum"]
 
+# the statistics computed by _BinMoments, without scipy
+moments_stats = {
+                "mean": lambda m: m.mean,
+                "std": lambda m: m.std,
+                "count": lambda m: m.count.astype(float),
+                "sum": lambda m: m.sum,
+                "min": lambda m: m.min,
+                "max": lambda m: m.max,
+                "mean+std": lambda m: m.mean+m.std,
+                "mean-std": lambda m: m.mean-m.std,
+                "median": lambda m: m.median,
+                "median+std": lambda m: m.median+m.std,
+                "median-std": lambda m: m.median-m.std,
+                # the std lines are the errors
+                "stdmean": lambda m: m.mean,
+                "stdmed": lambda m: m.median
+}
+
+# statistics computed from the BinedMoments of streamed data
+streamed_stats = ["mean", "std", "count", "sum", "mean+std", "mean-std", "stdmean"]
+
+# statistics computed from the quantiles, approximated by _QuantileSketch
+quantile_stats = ["median", "median+std", "median-std", "stdmed"]
+
+# functions with the same result than a _BinMoments statistic
+fstat_names = {
+                np.mean: "mean",
+                np.std: "std",
+                np.sum: "sum",
+                np.min: "min",
+                np.max: "max",
+                len: "count",
+                np.median: "median",
+                _plur_std: "mean+std",
+                _minus_std: "mean-std",
+                _medplur_std: "median+std",
+                _medminus_std: "median-std"
+}
+
+# the empty bins of the functions of fstat_names whose statistic differs,
+# they are function([]) as with scipy.stats.binned_statistic
+fstat_empty = {
+                np.std: np.nan
+}
+
 
 # lookup table for other functions
 fstat_lookup = {
@@ -51,24 +104,506 @@ fstat_lookup = {
                 "-std":_minus_std,
                 "mean+std":_plur_std,
                 "mean-std":_minus_std,
-                "med+std":_plur_std,
-                "med-std":_minus_std
+                "med+std":_medplur_std,
+                "med-std":_medminus_std
 }
 # lookup for relevant error computation
 # of the statistics
 fstat_err_lookup = {
-                    "mean":   "std",
-                    "median": "std",
-                    "count": lambda v: sqrt(len(v))
+                    "mean":   lambda m: m.std,
+                    "median": lambda m: m.std,
+                    "stdmean": lambda m: m.std,
+                    "stdmed": lambda m: m.std,
+                    "count": lambda m: np.sqrt(m.count)
                    }
 
 
+class _BinMoments(object):
+    """ count, sum, mean, std, min and max of values in the bins of x
+
+    The bin index of x is computed once (the uniform bins engine of
+    histogram for an int bins) and all the statistics are reduced from it
+    with np.bincount, or read in the values sorted by bin. Each statistic
+    is computed when first read. The index is the only array of the size
+    of x kept, the temporaries are by blocks. Values of x out of
+    the bins or NaN are ignored, as scipy.stats.binned_statistic the
+    statistics of an empty bin are NaN, count and sum are 0.
+    """
+    __slots__ = ("edges", "values", "index", "nbins",
+                 "_count", "_sum", "_mean", "_m2", "_min", "_max",
+                 "_sorted", "_start", "_hasnan")
+
+    def __init__(self, x, values, bins=10, range=None):
+        x = np.asarray(x).reshape(-1)
+        values = np.asarray(values).reshape(-1)
+        if x.size != values.size:
+            raise ValueError("indexes and data must have the same size got %d and %d"%(x.size, values.size))
+        if hasattr(bins, "__iter__"):
+            self.edges = np.asarray(bins, dtype=float)
+            binner = _bins_index(self.edges)
+        else:
+            vmin, vmax = _uniform_range(x, range)
+            binner = _UniformBins(int(bins), vmin, vmax)
+            self.edges = np.linspace(vmin, vmax, int(bins)+1)
+        # index 0 and nbins+1 are out of the bins
+        index = np.empty(x.size, np.intp)
+        for i in six.moves.range(0, x.size, _BLOCKSIZE):
+            index[i:i+_BLOCKSIZE] = binner.index(x[i:i+_BLOCKSIZE])
+        self._reset(index, len(self.edges)-1, values)
+
+    def _reset(self, index, nbins, values):
+        self.index = index
+        self.nbins = nbins
+        self.values = values
+        self._count = self._sum = self._mean = self._m2 = None
+        self._min = self._max = None
+        self._sorted = self._start = self._hasnan = None
+
+    def _bincount(self, weights=None):
+        return np.bincount(self.index, weights, minlength=self.nbins+2)[1:-1]
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = self._bincount()
+        return self._count
+
+    @property
+    def sum(self):
+        if self._sum is None:
+            self._sum = self._bincount(self.values)
+        return self._sum
+
+    @property
+    def mean(self):
+        if self._mean is None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._mean = self.sum/self.count
+        return self._mean
+
+    @property
+    def m2(self):
+        """ sum of the squared deviations to the mean of each bin """
+        if self._m2 is None:
+            # deviations to the mean of the bin, more accurate than sum2-sum**2
+            mean = np.concatenate(([0.0], self.mean, [0.0]))
+            m2 = np.zeros(self.nbins+2)
+            # blocks large enough for the bincount of all the bins
+            step = max(CHUNKSIZE, self.nbins)
+            for i in range(0, self.index.size, step):
+                index = self.index[i:i+step]
+                dev = self.values[i:i+step]-mean[index]
+                dev *= dev
+                m2 += np.bincount(index, dev, minlength=self.nbins+2)
+            self._m2 = m2[1:-1]
+        return self._m2
+
+    @property
+    def std(self):
+        # 0 for an empty bin, as scipy.stats.binned_statistic
+        return np.sqrt(self.m2/np.maximum(self.count, 1))
+
+    def _extremum(self, last):
+        """ the first or last of the values of each bin sorted by _sort """
+        values, start, hasnan = self._sort()
+        n = self.count
+        full = n > 0
+        result = np.empty(self.nbins)
+        result.fill(np.nan)
+        result[full] = values[start[full]+(n[full]-1 if last else 0)]
+        # as np.min a bin with a NaN value is NaN
+        result[hasnan] = np.nan
+        return result
+
+    @property
+    def min(self):
+        if self._min is None:
+            self._min = self._extremum(False)
+        return self._min
+
+    @property
+    def max(self):
+        if self._max is None:
+            self._max = self._extremum(True)
+        return self._max
+
+    def _sort(self):
+        """ the values sorted by (bin, value), the start of each bin and
+        the bins with a NaN value
+        """
+        if self._sorted is None:
+            # one sort of bin+1j*value, complex numbers are sorted by real
+            # then imaginary part. NaN are sorted after all the numbers, they
+            # are replaced by inf and their bins are flagged
+            key = np.empty(self.index.size, complex)
+            key.real, key.imag = self.index, self.values
+            hasnan = np.zeros(self.nbins+2, bool)
+            imag = key.imag
+            for i in range(0, key.size, _BLOCKSIZE):
+                block = imag[i:i+_BLOCKSIZE]
+                nan = np.isnan(block)
+                if nan.any():
+                    hasnan[self.index[i:i+_BLOCKSIZE][nan]] = True
+                    block[nan] = np.inf
+            self._hasnan = hasnan[1:-1]
+            key.sort()
+            self._sorted = key.imag
+            self._start = np.cumsum(np.bincount(self.index, minlength=self.nbins+2))[:-2]
+        return self._sorted, self._start, self._hasnan
+
+    def percentile(self, q):
+        """ the q-th percentile of the values of each bin, same as np.percentile """
+        values, start, hasnan = self._sort()
+        n = self.count
+        full = n > 0
+        result = np.empty(self.nbins)
+        result.fill(np.nan)
+        start, n = start[full], n[full]
+        # np.percentile linear interpolation between the closest ranks
+        rank = (q/100.0)*(n-1)
+        below = np.floor(rank).astype(np.intp)
+        above = np.minimum(below+1, n-1)
+        wabove = rank-below
+        result[full] = values[start+below]*(1.0-wabove)+values[start+above]*wabove
+        # as np.percentile a bin with a NaN value is NaN
+        result[hasnan] = np.nan
+        return result
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+
+class _BinMoments2d(_BinMoments):
+    """ _BinMoments of values in the 2d bins of x, y
+
+    The bin of a point is linearized in ix*ny+iy, edges and yedges are
+    the x and y edges (see np.histogram2d for bins and range). The
+    statistics are flat, reshape them to (nx, ny).
+    """
+    __slots__ = ("yedges",)
+
+    def __init__(self, x, y, values, bins=10, range=None):
+        x = np.asarray(x).reshape(-1)
+        y = np.asarray(y).reshape(-1)
+        values = np.asarray(values).reshape(-1)
+        if not (x.size == y.size == values.size):
+            raise ValueError("x, y and z must have the same size got %d, %d and %d"%(x.size, y.size, values.size))
+        self.edges, self.yedges = _histogram2d_edges(x, y, bins, range)
+        bx, by = _bins_index(self.edges), _bins_index(self.yedges)
+        nx, ny = len(self.edges)-1, len(self.yedges)-1
+        # 1 to nx*ny in the bins, 0 outside (nx*ny+1 is never used)
+        index = np.empty(x.size, np.intp)
+        for i in six.moves.range(0, x.size, _BLOCKSIZE):
+            s = slice(i, i+_BLOCKSIZE)
+            ix, iy = bx.index(x[s]), by.index(y[s])
+            out = index[s]
+            np.subtract(ix, 1, out=out)
+            out *= ny
+            out += iy
+            out[(ix < 1) | (ix > nx) | (iy < 1) | (iy > ny)] = 0
+        self._reset(index, nx*ny, values)
+
+
+class _QuantileSketch(object):
+    """ approximated statistics of values in the bins of x, with a bounded memory
+
+    The values of each bin are counted in a histogram of resolution bins
+    between their min and max, accumulated by chunks of x and values (they
+    can be np.memmap). The percentiles are interpolated in the histogram,
+    about (max-min)/resolution from the exact ones, mean and std are
+    computed from the histogram too. NaN values are ignored. Sketches
+    with the same edges can be merged. Same interface than _BinMoments.
+    """
+    __slots__ = ("edges", "vedges", "nbins", "counts")
+
+    def __init__(self, x, values, bins=10, range=None, resolution=1000,
+                 vrange=None, chunksize=CHUNKSIZE):
+        x = np.asarray(x).reshape(-1)
+        values = np.asarray(values).reshape(-1)
+        if hasattr(bins, "__iter__"):
+            self.edges = np.asarray(bins, dtype=float)
+        else:
+            vmin, vmax = _uniform_range(x, range, chunksize)
+            self.edges = np.linspace(vmin, vmax, int(bins)+1)
+        self.nbins = len(self.edges)-1
+        vmin, vmax = _uniform_range(values, vrange, chunksize)
+        self.vedges = np.linspace(vmin, vmax, int(resolution)+1)
+        self.counts = np.zeros((self.nbins, int(resolution)))
+        self.add(x, values, chunksize)
+
+    def add(self, x, values, chunksize=CHUNKSIZE):
+        """ add values in the sketch, values out of the value range are ignored """
+        self.counts += _histogram2d_part(np.asarray(x).reshape(-1),
+                                         np.asarray(values).reshape(-1), None,
+                                         self.edges, self.vedges, False,
+                                         chunksize).reshape(self.counts.shape)
+
+    def merge(self, other):
+        """ add the counts of an other sketch with the same edges """
+        if not (np.array_equal(self.edges, other.edges) and
+                np.array_equal(self.vedges, other.vedges)):
+            raise ValueError("cannot merge sketches with different bins")
+        self.counts += other.counts
+        return self
+
+    @property
+    def count(self):
+        return self.counts.sum(axis=1)
+
+    @property
+    def mean(self):
+        centers = 0.5*(self.vedges[:-1]+self.vedges[1:])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.counts.dot(centers)/self.count
+
+    @property
+    def std(self):
+        centers = 0.5*(self.vedges[:-1]+self.vedges[1:])
+        dev = centers[None, :]-np.nan_to_num(self.mean)[:, None]
+        dev *= dev
+        dev *= self.counts
+        return np.sqrt(dev.sum(axis=1)/np.maximum(self.count, 1))
+
+    def percentile(self, q):
+        counts = self.counts
+        cum = counts.cumsum(axis=1)
+        n = cum[:, -1]
+        rank = (q/100.0)*(n-1)
+        # the value bin of the rank and the position of the rank inside
+        k = np.minimum((cum <= rank[:, None]).sum(axis=1), counts.shape[1]-1)
+        rows = np.arange(len(counts))
+        ck = counts[rows, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = (rank-(cum[rows, k]-ck)+0.5)/ck
+        width = self.vedges[1]-self.vedges[0]
+        result = self.vedges[k]+np.clip(frac, 0, 1)*width
+        result[n == 0] = np.nan
+        return result
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+
+class BinedMoments(object):
+    """ count, mean and std of data in fixed bins of indexes, accumulated by chunks
+
+    The state of each bin is its count, mean and M2, the sum of squared
+    deviations to the mean. add(indexes, data) updates it with a chunk,
+    merge(other) with the state of an other BinedMoments with the same bins
+    (e.g. computed by a parallel worker), both with the Chan/Welford
+    pairwise update. The memory is the bins only.
+    A BinedMoments can be given as data to binedstat for the statistics
+    "mean", "std", "count", "sum", "mean+std", "mean-std" and "stdmean".
+
+    bins can also be [xedges, yedges] for the 2d bins of binedstat2d, then
+    indexes is a (x, y) tuple and the bins are linearized in ix*ny+iy.
+
+    Example:
+        moments = BinedMoments(bins=100, range=(0, 86400))
+        for t, v in chunks:
+            moments.add(t, v)
+        xyplot().ybinedstat(moments, fstat="mean", binerror=True)
+    """
+    def __init__(self, bins=10, range=None):
+        self.yedges = None
+        if not hasattr(bins, "__iter__"):
+            if range is None or None in range:
+                raise ValueError("BinedMoments needs the bins edges or a range")
+            vmin, vmax = _uniform_range(None, range)
+            bins = np.linspace(vmin, vmax, int(bins)+1)
+        elif len(bins) == 2 and all(hasattr(b, "__iter__") for b in bins):
+            bins, self.yedges = bins[0], np.asarray(bins[1], dtype=float)
+        self.edges = np.asarray(bins, dtype=float)
+        nbins = len(self.edges)-1
+        if self.yedges is not None:
+            nbins *= len(self.yedges)-1
+        self.count = np.zeros(nbins, int)
+        self.m2 = np.zeros(nbins)
+        self._mean = np.zeros(nbins)
+
+    def add(self, indexes, data):
+        """ add a chunk of data in the bins of indexes, return self """
+        if self.yedges is None:
+            chunk = _BinMoments(indexes, data, self.edges)
+        else:
+            x, y = indexes
+            chunk = _BinMoments2d(x, y, data, [self.edges, self.yedges])
+        self._update(chunk.count, chunk.mean, chunk.m2)
+        return self
+
+    def merge(self, other):
+        """ add the state of an other BinedMoments with the same bins, return self """
+        if not (np.array_equal(self.edges, other.edges) and
+                np.array_equal(self.yedges, other.yedges)):
+            raise ValueError("cannot merge BinedMoments with different bins")
+        self._update(other.count, other._mean, other.m2)
+        return self
+
+    def _update(self, count, mean, m2):
+        full = count > 0
+        na, nb = self.count[full], count[full]
+        n = na+nb
+        delta = mean[full]-self._mean[full]
+        frac = nb/n
+        self._mean[full] += delta*frac
+        self.m2[full] += m2[full]+delta*delta*na*frac
+        self.count[full] = n
+
+    @property
+    def mean(self):
+        mean = self._mean.copy()
+        mean[self.count == 0] = np.nan
+        return mean
+
+    @property
+    def sum(self):
+        return self._mean*self.count
+
+    @property
+    def std(self):
+        # 0 for an empty bin, as scipy.stats.binned_statistic
+        return np.sqrt(self.m2/np.maximum(self.count, 1))
+
+
+def _chunked_moments(size, bins, add, chunksize, workers=None):
+    """ the BinedMoments of size points accumulated by add(moments, i, j)
+    for the points i to j, by chunks of chunksize points. The chunks are
+    split between workers (see histogram._map_chunks) and merged in order.
+    """
+    def part(s):
+        moments = BinedMoments(bins)
+        stop = min(s.stop, size)
+        for i in range(s.start, stop, chunksize):
+            add(moments, i, min(i+chunksize, stop))
+        return moments
+    if workers is None:
+        slices = [slice(0, size)]
+    else:
+        slices = _split_chunks(size, workers)
+    moments = BinedMoments(bins)
+    for m in _map_chunks(part, [(sl,) for sl in slices], workers or 1):
+        moments.merge(m)
+    return moments
+
+def _stream_moments(indexes, data, bins, bin_range, chunksize, workers=None):
+    """ the BinedMoments of streamed data, see binedstat
+
+    data can be a DataFile, a np.memmap or an iterator of chunks. indexes
+    can be None (the position in data), an array sliced as data or an
+    iterator of the same chunks. The chunks of arrays are accumulated by
+    workers (see histogram._map_chunks) and merged in order.
+    """
+    if isinstance(data, DataFile):
+        data = data.memmap(flat=True)
+    if isinstance(indexes, DataFile):
+        indexes = indexes.memmap(flat=True)
+    if isinstance(data, np.ndarray):
+        data = data.reshape(-1)
+    if indexes is not None and not _is_streamed(indexes):
+        indexes = np.asarray(indexes)
+    if isinstance(indexes, np.ndarray):
+        indexes = indexes.reshape(-1)
+
+    if not hasattr(bins, "__iter__"):
+        vmin, vmax = bin_range
+        if vmin is None or vmax is None:
+            if indexes is None and isinstance(data, np.ndarray):
+                imin, imax = 0, max(data.size-1, 0)
+            elif isinstance(indexes, np.ndarray):
+                imin, imax = _uniform_range(indexes, None, chunksize)
+            else:
+                raise ValueError("binedstat of an iterator of chunks needs the bins edges or min and max")
+            vmin = imin if vmin is None else vmin
+            vmax = imax if vmax is None else vmax
+        vmin, vmax = _uniform_range(None, (vmin, vmax))
+        bins = np.linspace(vmin, vmax, int(bins)+1)
+
+    if isinstance(data, np.ndarray) and not _is_streamed(indexes):
+        def add(moments, i, j):
+            moments.add(np.arange(i, j) if indexes is None else indexes[i:j],
+                        data[i:j])
+        return _chunked_moments(data.size, bins, add, chunksize, workers)
+
+    # iterators are read in order
+    moments = BinedMoments(bins)
+    start = 0
+    for chunk, index in _iter_index_chunks(indexes, data, chunksize):
+        if index is None:
+            index = np.arange(start, start+chunk.size)
+            start += chunk.size
+        moments.merge(BinedMoments(bins).add(index, chunk))
+    return moments
+
+def _iter_index_chunks(indexes, data, chunksize):
+    """ yield (data chunk, indexes chunk or None) """
+    chunks = _iter_chunks(data, chunksize)
+    if indexes is None:
+        for chunk in chunks:
+            yield chunk, None
+    elif isinstance(indexes, np.ndarray):
+        i = 0
+        for chunk in chunks:
+            yield chunk, indexes[i:i+chunk.size]
+            i += chunk.size
+    else:
+        for chunk, index in six.moves.zip(chunks, _iter_chunks(indexes, chunksize)):
+            yield chunk, index
+
+
+def _percentile_q(fstat):
+    """ q for a "p<q>" percentile name (e.g. "p90"), None otherwise """
+    if isinstance(fstat, basestring) and fstat.startswith("p"):
+        try:
+            q = float(fstat[1:])
+        except ValueError:
+            return None
+        if 0 <= q <= 100:
+            return q
+    return None
+
+
+def _parse_fstat(fstat):
+    """ the name of fstat if it has one (see fstat_names and fstat_lookup)
+    and q for a percentile, return fstat, q
+    """
+    if not isinstance(fstat, basestring):
+        fstat = fstat_names.get(fstat, fstat)
+
+    q = _percentile_q(fstat)
+    if (isinstance(fstat, basestring) and (fstat not in handled)
+        and (fstat not in moments_stats) and q is None):
+        try:
+            fstat = fstat_lookup[fstat]
+        except KeyError:
+            raise ValueError("'%s' is not a valid function name should be one of %s"%(fstat,
+                             "'"+"', '".join(set(handled+fstat_lookup.keys()+moments_stats.keys()))+"'"
+                             ))
+        fstat = fstat_names.get(fstat, fstat)
+    return fstat, q
+
+def _moments_stat(moments, fstat, q=None):
+    """ the statistic computed from moments, None if it cannot """
+    if q is not None:
+        return moments.percentile(q)
+    if isinstance(fstat, basestring) and fstat in moments_stats:
+        return moments_stats[fstat](moments)
+    return None
+
 def _statbin(x, values, fstat="mean", bins=10,
              range=None, binerror=False,
-             centered=True, sigma=1.0):
-    """ return the binned_statistic from scipy.stats
+             centered=True, sigma=1.0, sketch=None, moments=None):
+    """ return the binned statistic of values in the bins of x
     return bins, stats, error
 
+    The common statistics, the median, the percentiles and their errors are
+    computed in one pass by _BinMoments, other ones (a user function) by
+    scipy.stats.binned_statistic. If sketch is an int, the median and
+    percentiles are approximated by a _QuantileSketch of sketch bins.
+    moments is a BinedMoments to take the statistics from, x and values
+    are then ignored.
+
     stats can is a list of statistic, for instance if fsat="std"
     it is 2 stats [mean+std*sigma, mean-std*sigma]
     default sigma is one.
@@ -77,26 +612,38 @@ def _statbin(x, values, fstat="mean", bins=10,
     ## if already handled by binned_statistic or by this func do nothing
     # else look in lookup
 
-    if isinstance(fstat, basestring) and (fstat not in handled):
-        try:
-            fstat = fstat_lookup[fstat]
-        except KeyError:
-            raise ValueError("'%s' is not a valid function name should be one of %s"%(fstat,
-                             "'"+"', '".join(set(handled+fstat_lookup.keys()))+"'"
-                             ))
+    # errors are computed for the statistic names only
+    errname = fstat if isinstance(fstat, basestring) else None
+    empty = None if errname else fstat_empty.get(fstat)
+    fstat, q = _parse_fstat(fstat)
     # if count bineerror does not make sens
-    if (fstat is "count") and binerror:
+    if (errname == "count") and binerror:
       binerror = False
 
-    stat, bins, _ = binned_statistic(x, values, fstat, bins, range)
-    if fstat in fstat_err_lookup:
+    # the index of x is computed once for all the statistics
+    if moments is not None:
+        if q is not None or fstat not in streamed_stats:
+            raise ValueError("fstat=%r cannot be computed from streamed data should be one of %s"%(fstat,
+                             "'"+"', '".join(streamed_stats)+"'"))
+    elif sketch is not None and (q is not None or fstat in quantile_stats):
+        moments = _QuantileSketch(x, values, bins, range, sketch)
+    else:
+        moments = _BinMoments(x, values, bins, range)
+    bins = moments.edges
+    stat = _moments_stat(moments, fstat, q)
+    if stat is None:
+        if binned_statistic is None:
+            raise TypeError("fstat=%r needs scipy.stats.binned_statistic"%(fstat,))
+        stat, _, _ = binned_statistic(x, values, fstat, bins)
+    if empty is not None:
+        stat = np.where(moments.count > 0, stat, empty)
+
+    if errname in fstat_err_lookup:
         # compute errors if we can
-        stat_err, _, _ = binned_statistic(x, values, fstat_err_lookup[fstat], bins, range)
-        stat_err *= sigma
+        stat_err = fstat_err_lookup[errname](moments)*sigma
         if binerror:
           # if binederror we need also the histogram
-          N, _, _ = binned_statistic(x, values, "count", bins, range)
-          stat_err = stat_err/np.sqrt(N)
+          stat_err = stat_err/np.sqrt(moments.count)
 
     else:
       stat_err = None
@@ -117,9 +664,10 @@ def binedstat(plot, *args,**kwargs):
         None it is np.arange(data.size)
 
       fstat : can be on of the following:
-          "mean" (default), "median", "min", "max"
-          "std" or "stdmean" -> two lines around the mean separated to +/-std*sigma
-          "stdmed" -> two std lines arouond the median
+          "mean" (default), "median", "min", "max", "sum", "count", "std"
+          "p<q>" -> the q-th percentile, e.g. "p90"
+          "stdmean" -> the mean with +/-std*sigma errors
+          "stdmed" -> the median with +/-std*sigma errors
           Or any user method that takes an array and return a scalar
 
       bins : int or sequence of scalars, optional
@@ -127,6 +675,20 @@ def binedstat(plot, *args,**kwargs):
           bins in the given range (10, by default). If `bins` is a sequence,
           it defines the bin edges, including the rightmost edge, allowing
           for non-uniform bin widths.
+          If "auto-fast" the number of bins is estimated on a random sample
+          of the indexes, see histogram.
+
+      seed : the seed of the bins="auto-fast" random sample (default 0)
+
+      chunksize : number of values read at ones for streamed data (see below)
+
+      workers : int or executor, the chunks of streamed arrays are
+          accumulated in parallel threads (see histogram)
+
+      sketch : None (default) or int. If an int, the median and percentiles
+          are approximated from a histogram of the data in sketch bins per
+          bin, about (max-min)/sketch from the exact value. The data are
+          read by chunks with a bounded memory (e.g. a np.memmap).
 
       min, max : the minimum and maximum for indexes. None is np.min() or np.max()
 
@@ -143,6 +705,17 @@ def binedstat(plot, *args,**kwargs):
       go : a go list to execute after creation (see PlotFactory doc)
         example ["line", "fill"]
 
+    Streamed data:
+    --------------
+    If data is a np.memmap, a DataFile or an iterator of chunks (indexes
+    being then None, an array or an iterator of the same chunks) the
+    statistics are accumulated by chunks in a BinedMoments with a bounded
+    memory. For an iterator the bins must be edges or min and max given.
+    data can also be a BinedMoments already accumulated, it is kept in the
+    "moments" parameter. Only "mean", "std", "count", "sum", "mean+std",
+    "mean-std" and "stdmean" can be streamed. A np.memmap with an other
+    statistic or with sketch is read as an array (by chunks for sketch).
+
     Affected Plot Parameters:
     -----------------------
     if direction == "y" (default)
@@ -175,32 +748,69 @@ def binedstat(plot, *args,**kwargs):
     plot.update(kwargs.pop(KWS,{}),**kwargs)
 
     (data, indexes,  fstat, bins,
-     _min, _max, sigma, binerror
+     _min, _max, sigma, binerror, seed, sketch, chunksize, workers
           ) = plot.parseargs(args,
                              "data", "indexes",
                              "fstat","bins",
                              "min", "max","sigma",
-                             "binerror",
+                             "binerror", "seed", "sketch",
+                             "chunksize", "workers",
                              fstat=np.mean, bins=10,
                              min=None, max=None,
                              sigma=1.0,centered=True,
-                             binerror=False
+                             binerror=False, seed=0, sketch=None,
+                             chunksize=CHUNKSIZE, workers=None
                            )
 
 
     di, dd = plot._get_direction()
 
-    data = np.asarray(data).flatten()
+    if isinstance(data, np.memmap):
+        # the other statistics need the whole array
+        name, q = _parse_fstat(fstat)
+        streamed = sketch is None and q is None and name in streamed_stats
+    else:
+        streamed = isinstance(data, (BinedMoments, DataFile)) or _is_streamed(data)
+
+    if streamed:
+        if isinstance(data, BinedMoments):
+            moments = data
+        else:
+            if isinstance(bins, basestring) and bins == AUTOFAST:
+                sample = indexes
+                if isinstance(sample, DataFile):
+                    sample = sample.memmap(flat=True)
+                if not isinstance(sample, np.ndarray):
+                    raise ValueError("bins='%s' needs the indexes in an array or a np.memmap"%AUTOFAST)
+                bins, (_min, _max) = _auto_fast_bins(sample, (_min, _max), seed)
+            moments = _stream_moments(indexes, data, bins, (_min, _max),
+                                      chunksize, workers)
+            if not isinstance(data, (np.ndarray, DataFile)):
+                # the iterators are consumed
+                data = None
+            if not isinstance(indexes, (np.ndarray, DataFile)):
+                indexes = None
+        bins, stats, err = _statbin(None, None, fstat=fstat, bins=None,
+                                    binerror=binerror, sigma=sigma,
+                                    moments=moments)
+        _makebinedstatplot(plot, stats, bins, err)
+        plot.update(data=data, indexes=indexes, moments=moments)
+        plot.goifgo()
+        return
+
+    data = np.asarray(data).reshape(-1)
     if indexes is None:
       indexes = np.arange(data.size)
     else:
       indexes = np.asarray(indexes)
 
     _range = (np.min(indexes) if _min is None else _min, np.max(indexes) if _max is None else _max)
+    if isinstance(bins, basestring) and bins == AUTOFAST:
+        bins, _range = _auto_fast_bins(indexes, _range, seed)
 
     bins, stats, err= _statbin(indexes, data, fstat=fstat, bins=bins, range=_range,
                                binerror=binerror,
-                               sigma=sigma
+                               sigma=sigma, sketch=sketch
                                )
 
     _makebinedstatplot(plot, stats, bins, err)
@@ -210,12 +820,104 @@ def binedstat(plot, *args,**kwargs):
 
 
 
+def _statbin2d(x, y, z, fstat="mean", bins=10, bin_range=None,
+               chunksize=CHUNKSIZE, workers=None):
+    """ the statistic of z in the 2d bins of x, y
+    return stat, count, xedges, yedges with stat and count of shape (nx, ny)
+
+    bins and bin_range are the ones of np.histogram2d. The statistics of
+    _BinMoments are computed on the linearized 2d bin index (_BinMoments2d),
+    a user function by scipy.stats.binned_statistic_2d. The streamable
+    statistics (see BinedMoments) are accumulated by chunks of chunksize
+    points, in parallel if workers is given.
+    """
+    empty = None if isinstance(fstat, basestring) else fstat_empty.get(fstat)
+    fstat, q = _parse_fstat(fstat)
+    x = np.asarray(x).reshape(-1)
+    y = np.asarray(y).reshape(-1)
+    z = np.asarray(z).reshape(-1)
+    if not (x.size == y.size == z.size):
+        raise ValueError("x, y and z must have the same size got %d, %d and %d"%(x.size, y.size, z.size))
+    xedges, yedges = _histogram2d_edges(x, y, bins, bin_range)
+    shape = (len(xedges)-1, len(yedges)-1)
+
+    if q is None and fstat in streamed_stats and (workers is not None or x.size > chunksize):
+        def add(moments, i, j):
+            moments.add((x[i:j], y[i:j]), z[i:j])
+        moments = _chunked_moments(x.size, [xedges, yedges], add, chunksize, workers)
+    else:
+        moments = _BinMoments2d(x, y, z, [xedges, yedges])
+
+    stat = _moments_stat(moments, fstat, q)
+    if stat is None:
+        if binned_statistic_2d is None:
+            raise TypeError("fstat=%r needs scipy.stats.binned_statistic_2d"%(fstat,))
+        stat = binned_statistic_2d(x, y, z, fstat, [xedges, yedges])[0]
+    if empty is not None:
+        stat = np.where(moments.count.reshape(stat.shape) > 0, stat, empty)
+    return stat.reshape(shape), moments.count.reshape(shape), xedges, yedges
+
+@xyzplot.decorate()
+def binedstat2d(plot, *args, **kwargs):
+    """ Plot Factory of a statistic of z in the 2d bins of x and y, e.g. a map
+
+    Parameters:
+    -----------
+      x, y : the coordinates binned as np.histogram2d
+
+      z : the data on which fstat is applied in each bin
+
+      fstat : the statistic, same as binedstat (default "mean"). "mean",
+          "std", "count", "sum", "min", "max", "median", "p<q>" are
+          computed by a vectorized engine, a user function needs scipy.
+
+      bins : int or [int, int] or array or [array, array], see np.histogram2d
+
+      range : [[xmin, xmax], [ymin, ymax]], see np.histogram2d
+
+      cmin, cmax : the bins with a count lower than cmin or higher than cmax
+          are set to NaN
+
+      chunksize, workers : "mean", "std", "count", "sum", "mean+std",
+          "mean-std" are accumulated by chunks of chunksize points, in
+          parallel threads if workers is given (see histogram)
+
+    Affected Plot Parameters:
+    -----------------------
+      xedges, yedges : the bins edges, also in x and y
+      hist : the (nx, ny) statistic, NaN for empty bins
+      count : the (nx, ny) number of points in each bin
+      X, Y : the bins corners of the (ny, nx) grid
+      colors, Z : hist.T
+    """
+    plot.update(kwargs.pop(KWS, {}), **kwargs)
+    (x, y, z, fstat,
+    bins, bin_range, cmin, cmax,
+    chunksize, workers) = plot.parseargs(args, "x", "y", "z", "fstat",
+                        "bins", "range", "cmin", "cmax",
+                        "chunksize", "workers",
+                        fstat="mean", bins=10, range=None,
+                        cmin=None, cmax=None,
+                        chunksize=CHUNKSIZE, workers=None)
+
+    h, count, xedges, yedges = _statbin2d(x, y, z, fstat, bins, bin_range,
+                                          chunksize, workers)
+    if cmin is not None:
+        h[count < cmin] = np.nan
+    if cmax is not None:
+        h[count > cmax] = np.nan
+
+    plot.update(xedges=xedges, yedges=yedges, hist=h, count=count,
+                x=alias("xedges"), y=alias("yedges")
+                )
+    _set_grid(plot, xedges, yedges, h.T)
+    plot.goifgo()
+
+
 try:
-    from scipy.stats import binned_statistic
-except:
-    @statplot.decorate()
-    def binedstat(plot, *args,**kwargs):
-        raise TypeError("This function needs scipy.stats.binned_statistic")
+    from scipy.stats import binned_statistic, binned_statistic_2d
+except ImportError:
+    binned_statistic = binned_statistic_2d = None
 
 
 #####
@@ -231,6 +933,9 @@ xbinedstat = binedstat.derive(data=alias("x"), indexes=alias("y"), direction="x"
 XYPlot.ybinedstat = ybinedstat
 XYPlot.xbinedstat = xbinedstat
 
+XYPlot.binedstat2d = binedstat2d
+XYZPlot.binedstat2d = binedstat2d
+
 
 
 
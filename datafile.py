@@ -0,0 +1,81 @@
+from __future__ import division, absolute_import, print_function
+
+import os
+import numpy as np
+
+class DataFile(object):
+    """ a lightweight reference to an array stored in a .npy or raw binary file
+
+    The file is memory-mapped only when read, so a plot can keep a DataFile in
+    its parameters without pinning the data in memory. histogram reads it
+    block by block (see histogram, chunksize and workers).
+
+    Parameters
+    ----------
+    path : string
+        a .npy file or a raw binary file
+    dtype : data-type, optional
+        the dtype of a raw file, default is little-endian float64 '<f8'.
+        Ignored for a .npy file (read in the header).
+    offset : int, optional
+        the number of bytes to skip in a raw file (e.g. a header)
+    shape : tuple, optional
+        the shape of a raw file, default is all the values after offset.
+
+    Example
+    -------
+    >>> h = histogram(DataFile("events.f8"), bins=100, range=(0, 10), workers=4)
+    >>> h["data"]
+    DataFile('events.f8', dtype='<f8', offset=0, shape=(1000000000,))
+    """
+    __slots__ = ("path", "dtype", "offset", "shape", "order")
+
+    def __init__(self, path, dtype=None, offset=0, shape=None):
+        self.path = path
+        self.order = "C"
+        if path.endswith(".npy"):
+            with open(path, "rb") as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+                offset = f.tell()
+            if dtype.hasobject:
+                raise ValueError("cannot memory-map the objects of '%s'"%path)
+            if fortran:
+                self.order = "F"
+        else:
+            dtype = np.dtype("<f8" if dtype is None else dtype)
+            if shape is None:
+                shape = ((os.path.getsize(path)-offset)//dtype.itemsize,)
+        self.dtype = np.dtype(dtype)
+        self.offset = offset
+        self.shape = (shape,) if isinstance(shape, (int, long)) else tuple(shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def memmap(self, flat=False):
+        """ the read-only np.memmap of the file
+
+        if flat is True the values are mapped in a 1d array in the file
+        order, without copy.
+        """
+        shape = (self.size,) if flat else self.shape
+        if not self.size:
+            # an empty file cannot be mapped
+            return np.zeros(shape, self.dtype)
+        return np.memmap(self.path, self.dtype, "r", self.offset, shape, self.order)
+
+    def __array__(self, dtype=None):
+        a = self.memmap()
+        return a if dtype is None else a.astype(dtype)
+
+    def __repr__(self):
+        return "DataFile(%r, dtype=%r, offset=%d, shape=%r)"%(self.path, self.dtype.str,
+                                                             self.offset, self.shape)
@@ -64,10 +64,10 @@ def distribfit(plot, *args, **kwargs):
     #y = distrib.pdf(x, loc, scale)*amplitude
 
     x = alias( lambda p: np.linspace(p["min"], p["max"], p["npoints"]),               
-               "-> linspace(min, max, npoints)")
+               "-> linspace(min, max, npoints)", memo=True)
     y = alias(
               lambda p: distrib.pdf(p["x"], loc, scale)*amplitude,
-              "-> fit(x)"
+              "-> fit(x)", memo=True
               )
     #x = np.linspace(_min, _max, npoints)
     #y = distrib.pdf(x, loc, scale)*amplitude
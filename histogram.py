@@ -1,21 +1,34 @@
 from __future__ import division, absolute_import, print_function
-from .recursive import KWS, alias
+from .recursive import KWS, alias, _submit
 import matplotlib.mlab as mlab
 import matplotlib.pyplot as plt
 
 from .plotclasses import (DataPlot, dataplot, XYPlot, xyplot,
                           ImgPlot, XYZPlot, xyzplot
                          )
+from .datafile import DataFile
 
 import numpy as np
 
 
 
 import matplotlib.cbook as cbook
+from matplotlib.lines import Line2D
+from matplotlib.patches import Polygon
+from matplotlib.container import BarContainer, ErrorbarContainer
 import six
 
 histogram = xyplot.derive()
 
+# default number of values histogrammed at ones for streamed data
+CHUNKSIZE = 2**20
+# number of values binned at ones by the uniform bins engine (fits in cache)
+_BLOCKSIZE = 2**16
+
+# bins method estimated on a sample of AUTOFAST_SAMPLESIZE values
+AUTOFAST = "auto-fast"
+AUTOFAST_SAMPLESIZE = 2**16
+
 def _statbin(x, values, fstat="mean", bins=10,
              range=None, binerror=False,
              centered=True, sigma=1.0):
@@ -70,14 +83,23 @@ def histogram(plot, *args, **kwargs):
     ----------------------    
     data : array like
         the one dimentional array of data to build histogram of
-    bins : array, tuple, int, optional
+    bins : array, tuple, int, string, optional
         Array of bins or tuple of (min, max, N) or a integer (default=10)
         If an integer, the min(data), max(data) are taken.
+        Uniform bins (an integer) are computed by a faster engine than
+        numpy.histogram, with the same edges and counts (float32 data have
+        float32 edges) but NaN values are ignored.
+        A string is one of the numpy.histogram methods (e.g. "auto", "fd")
+        or "auto-fast": the numpy "auto" rule with the interquartile range
+        estimated on a random sample (see seed), fast on huge data.
+    seed : int, optional
+        seed of the random sample of bins="auto-fast" (default 0)
     range : 2xtuple, optional  
         min, max boundary for the data. None means no boundary.
         e.g:  (None,4.5) will take 4.5 as maximum and no minimum constrains
     weights : array like, optional
-        data weights, must be of the same size than data
+        data weights, must be of the same size than data. If data is an
+        iterator of chunks, weights can be an iterator of the same chunks.
     density : bool, optional 
         If False (default), the result will contain the number of samples
         in each bin.  If True, the result is the value of the
@@ -86,6 +108,25 @@ def histogram(plot, *args, **kwargs):
         histogram values will not be equal to 1 unless bins of unity
         width are chosen; it is not a probability *mass* function.
         Overrides the `normed` keyword if given.
+    chunksize : int, optional
+        number of values histogrammed at ones when data is streamed, see below
+    workers : int or executor, optional
+        If given, the data is split in chunks histogrammed in parallel
+        threads and the partial counts are summed. workers is a number of
+        threads or a concurrent.futures.ThreadPoolExecutor or a
+        multiprocessing.pool.ThreadPool. Integer counts are identical to
+        the serial ones.
+
+    Streamed data
+    -------------
+    If data is a np.memmap or an iterator of arrays (e.g. a generator reading
+    a file by blocks) the histogram is accumulated chunk by chunk and the full
+    data set is never in memory. The bins must then be fixed : an array of
+    edges or a number of bins with a range. For a np.memmap, a missing range
+    is computed with a first pass on the data.
+    data (and weights) can also be a DataFile, a reference to a .npy or raw
+    binary file which is memory-mapped and streamed. The plot keeps the
+    DataFile in "data", not the array.
 
     Specific Plot Parameters    
     ------------------------    
@@ -122,31 +163,592 @@ def histogram(plot, *args, **kwargs):
     """    
     plot.update(kwargs.pop(KWS,{}), **kwargs)
 
-    (data, bins, bin_range, weights, density) = plot.parseargs(args,
-             "data", "bins", "range",  "weights", "density",
-             bins=10, range=None,  weights=None, density=False)
-
-
-    
+    (data, bins, bin_range, weights, density, chunksize, workers,
+     seed) = plot.parseargs(args,
+             "data", "bins", "range",  "weights", "density", "chunksize",
+             "workers", "seed",
+             bins=10, range=None,  weights=None, density=False,
+             chunksize=CHUNKSIZE, workers=None, seed=0)
+
+    # a DataFile is histogrammed from its memmap, the plot keeps the reference
+    source = data if isinstance(data, DataFile) else None
+    if source is not None:
+        data = source.memmap(flat=True)
+    if isinstance(weights, DataFile):
+        weights = weights.memmap(flat=True)
+
+    if isinstance(bins, basestring):
+        if bins == AUTOFAST:
+            bins, bin_range = _auto_fast_bins(data, bin_range, seed)
+        else:
+            # numpy methods give uniform bins, computed by the uniform engine
+            edges = np.histogram_bin_edges(data, bins, bin_range, weights)
+            bins, bin_range = len(edges)-1, (edges[0], edges[-1])
+
+    # with weights the sum of squared weights is computed in the same pass
+    sumw2 = weights is not None
+    if _is_streamed(data):
+        counts, bins = _stream_histogram(data, bins, bin_range, weights,
+                                         chunksize, workers, sumw2)
+        if not isinstance(data, np.ndarray):
+            # the iterator is consumed
+            data = None
+    elif workers is not None:
+        counts, bins = _parallel_histogram(data, bins, bin_range, weights,
+                                           workers, sumw2)
+    elif not hasattr(bins, "__iter__"):
+        counts, bins = _uniform_histogram(data, bins, bin_range, weights, sumw2)
+    elif sumw2:
+        bins = np.asarray(bins)
+        counts = _edges_counts(data, bins, weights, sumw2=True)
+    else:
+        counts, bins = np.histogram(data, bins, range=bin_range)
 
-    binsgiven = (hasattr(bins, "__iter__") or bin_range is not None)
-    if not binsgiven:
-        bin_range = (np.nanmin(data), np.nanmax(data))
+    if sumw2:
+        counts, sumw2 = counts
+    else:
+        sumw2 = None
+    _histogram_plot(plot, data if source is None else source, counts, bins,
+                    density, sumw2)
+    plot.goifgo()
 
+def _histogram_plot(plot, data, counts, bins, density, sumw2=None):
+    """ fill the histogram plot from the counts and the bin edges
 
-    m, bins = np.histogram(data, bins, weights=weights, range=bin_range,
-                           density=density
-                          )
+    sumw2 is the sum of the squared weights per bin, the counts if None.
+    The errors are sqrt(sumw2), normalized as the histogram if density.
+    The histogram and the errors are in the float dtype of the bins and of
+    weighted counts (e.g. float32 for float32 data, see _edges_dtype), or
+    float64 when this dtype cannot hold the counts exactly. The
+    counts and sumw2 of int counts are float64: they stay exact when
+    accumulated by LiveHistogram.
+    """
+    fdtype = _edges_dtype(np.asarray(bins))
+    if counts.dtype.kind == "f":
+        fdtype = np.result_type(fdtype, counts.dtype)
+    elif not density and counts.size and counts.max() > 2**(np.finfo(fdtype).nmant+1):
+        # float32 counts are exact up to 2**24 only
+        fdtype = np.dtype(float)
+    # causes problems later if it's an int
+    counts = counts.astype(np.result_type(counts, float))
+    sumw2 = counts.copy() if sumw2 is None else sumw2.astype(counts.dtype)
+    err = np.sqrt(sumw2)
     if density:
-        ## TODO: compute errorbars for density == True
-        err = None
+        # same as np.histogram
+        norm = np.diff(bins)*counts.sum()
+        m = counts/norm
+        err /= norm
     else:
-        err = np.sqrt(m)
-    m = m.astype(float)  # causes problems later if it's an int
+        m = counts
+    m, err = m.astype(fdtype), err.astype(fdtype, copy=False)
 
     plot["data"] = data # set the data, in case it was an alias for instance
+    plot["counts"] = counts # the counts without density, see LiveHistogram
+    plot["sumw2"] = sumw2
     _makebinedstatplot(plot, m, bins, err)
-    plot.goifgo()
+
+def _is_streamed(data):
+    """ True if data is a np.memmap or an iterator of chunks """
+    if isinstance(data, np.ndarray):
+        return isinstance(data, np.memmap)
+    return hasattr(data, "next") or hasattr(data, "__next__")
+
+def _iter_chunks(data, chunksize):
+    """ yield the flat chunks of a np.memmap or of an iterator of arrays """
+    if isinstance(data, np.ndarray):
+        data = data.reshape(-1)
+        for i in range(0, data.size, chunksize):
+            yield data[i:i+chunksize]
+    else:
+        for chunk in data:
+            yield np.asarray(chunk).reshape(-1)
+
+def _iter_weights(weights, chunks):
+    """ yield (chunk, weights chunk) for each chunks
+
+    weights can be None, an array (sliced as the data) or an iterator of chunks
+    """
+    if weights is None:
+        for chunk in chunks:
+            yield chunk, None
+    elif isinstance(weights, np.ndarray) or not _is_streamed(weights):
+        weights = np.asarray(weights).reshape(-1)
+        i = 0
+        for chunk in chunks:
+            yield chunk, weights[i:i+chunk.size]
+            i += chunk.size
+    else:
+        for chunk, w in six.moves.zip(chunks, weights):
+            yield chunk, np.asarray(w).reshape(-1)
+
+def _stream_range(data, chunksize):
+    """ nanmin, nanmax of an array or np.memmap read by chunks
+
+    min and max are computed on the same chunk while it is in cache
+    (np.fmin, np.fmax ignore NaN without copy).
+    """
+    vmin, vmax = np.inf, -np.inf
+    for chunk in _iter_chunks(data, chunksize):
+        if chunk.size:
+            vmin = min(vmin, np.fmin.reduce(chunk))
+            vmax = max(vmax, np.fmax.reduce(chunk))
+    return vmin, vmax
+
+def _data_range(dmin, dmax):
+    """ the range of data from its nanmin, nanmax (see _stream_range)
+
+    as np.histogram (0, 1) for empty data and a ValueError for infinite values
+    """
+    if dmin > dmax:
+        # empty data or only NaN
+        return 0.0, 1.0
+    if not (np.isfinite(dmin) and np.isfinite(dmax)):
+        raise ValueError("autodetected range of [%s, %s] is not finite"%(dmin, dmax))
+    return dmin, dmax
+
+def _uniform_range(data, bin_range, chunksize=_BLOCKSIZE):
+    """ the (min, max) of uniform bins, None in bin_range are taken from data
+
+    same rules than np.histogram for empty data, infinite values or min == max
+    """
+    vmin, vmax = bin_range if bin_range is not None else (None, None)
+    if vmin is None or vmax is None:
+        dmin, dmax = _data_range(*_stream_range(data, chunksize))
+        vmin = dmin if vmin is None else vmin
+        vmax = dmax if vmax is None else vmax
+    if vmin > vmax:
+        raise ValueError("max must be larger than min in range parameter.")
+    if not (np.isfinite(vmin) and np.isfinite(vmax)):
+        raise ValueError("supplied range of [%s, %s] is not finite"%(vmin, vmax))
+    if vmin == vmax:
+        vmin, vmax = vmin-0.5, vmax+0.5
+    return vmin, vmax
+
+def _edges_dtype(data):
+    """ the dtype of the uniform bin edges of data, as np.histogram: the
+    float dtype of data (float32 or float64), float64 for the others (a
+    float16 histogram would round the counts above 2048)
+    """
+    dtype = getattr(data, "dtype", None)
+    if dtype is not None and dtype.kind == "f" and 4 <= dtype.itemsize <= 8:
+        return dtype
+    return np.dtype(float)
+
+def _uniform_edges(nbins, vmin, vmax, dtype=float):
+    """ the edges of nbins uniform bins, as np.histogram """
+    return np.linspace(vmin, vmax, int(nbins)+1, dtype=dtype)
+
+class _UniformBins(object):
+    """ bin index of values in nbins uniform bins between vmin and vmax
+
+    index(block) return the index of the bin of each value shifted by one:
+    0 and nbins+1 are the under and overflow, NaN is in the underflow. As
+    np.histogram the last bin includes vmax and the values falling at a
+    rounding error of an edge are put in the bin given by the edges.
+    The edges are of dtype, float32 edges for float32 data as np.histogram
+    (see _edges_dtype).
+    The buffers are reused between calls, the returned index too.
+    """
+    __slots__ = ("nbins", "vmin", "vmax", "norm", "edges", "tol",
+                 "_tmp", "_frac", "_index", "_near")
+
+    def __init__(self, nbins, vmin, vmax, blocksize=_BLOCKSIZE, dtype=float):
+        self.nbins = nbins = int(nbins)
+        # float64 norm, the min and max of float32 data are float32 scalars
+        self.vmin, self.vmax = vmin, vmax = float(vmin), float(vmax)
+        self.norm = norm = nbins/(vmax-vmin)
+        # edges of the bins with the underflow and overflow
+        self.edges = np.empty(nbins+3, dtype)
+        self.edges[0], self.edges[1:-1], self.edges[-1] = (-np.inf,
+                                _uniform_edges(nbins, vmin, vmax, dtype), np.inf)
+        # rounding errors of the index and of the edges, in bin unit
+        scale = max(abs(vmin), abs(vmax))*norm
+        self.tol = (64*np.finfo(float).eps*(nbins+2+scale)+
+                    4*np.finfo(dtype).eps*scale)
+        self._tmp, self._frac = np.empty(blocksize, float), np.empty(blocksize, float)
+        self._index = np.empty(blocksize, np.intp)
+        self._near = np.empty(blocksize, bool)
+
+    def index(self, block):
+        n = block.size
+        if n > self._index.size:
+            self.__init__(self.nbins, self.vmin, self.vmax, n, self.edges.dtype)
+        nbins, edges = self.nbins, self.edges
+        t, ix, f, nr = self._tmp[:n], self._index[:n], self._frac[:n], self._near[:n]
+        # the index of float32 data is computed in float32 (the tolerance
+        # is the one of the edges), in float64 for data less precise than
+        # the edges (float16 data, float32 data in float64 edges)
+        exact = block.dtype.kind == "f" and block.dtype.itemsize < edges.dtype.itemsize
+        np.subtract(block, self.vmin, out=t, dtype=t.dtype if exact else None)
+        t *= self.norm
+        # -1 and nbins+1 are the under and overflow, NaN casts to a
+        # negative int clipped to the underflow
+        np.clip(t, -1, nbins, out=t)
+        t += 1
+        ix[...] = t
+        np.clip(ix, 0, nbins+1, out=ix)
+
+        # values close to an edge are checked against the edges
+        np.subtract(t, ix, out=f)
+        f -= 0.5
+        np.abs(f, out=f)
+        with np.errstate(invalid="ignore"):
+            # NaN are not close to an edge
+            np.greater(f, 0.5-self.tol, out=nr)
+        if nr.any():
+            k = np.flatnonzero(nr)
+            bk, ik = block[k], ix[k]
+            ik -= bk < edges[ik]
+            ik += bk >= edges[ik+1]
+            ik[bk == self.vmax] = nbins
+            ix[k] = ik
+        return ix
+
+class _EdgesBins(object):
+    """ same as _UniformBins for an array of edges, NaN is in the overflow """
+    __slots__ = ("nbins", "edges")
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges)
+        self.nbins = len(edges)-1
+
+    def index(self, block):
+        ix = np.searchsorted(self.edges, block, "right")
+        ix[block == self.edges[-1]] = self.nbins
+        return ix
+
+def _uniform_counts(data, nbins, vmin, vmax, weights=None, nseries=1,
+                    sumw2=False, dtype=None):
+    """ counts of data in nbins uniform bins between vmin and vmax
+
+    If nseries>1 data is made of nseries series of the same size (e.g. the
+    rows of a 2d array), the counts of each series are returned in a
+    (nseries, nbins) array.
+
+    If sumw2 is True the sum of the squared weights is computed with the same
+    bin indexes and the returned array is stacked [counts, sumw2] (sumw2 is
+    the counts without weights).
+
+    The bin index is computed from the value and counted with np.bincount,
+    by blocks of _BLOCKSIZE to stay in cache. NaN and values outside the
+    range fall in the under/overflow bins which are dropped. As
+    np.histogram the last bin includes vmax and the values falling at a
+    rounding error of an edge are put in the bin given by the edges.
+    dtype is the dtype of the edges, by default the one of data (see
+    _edges_dtype).
+    """
+    data = np.asarray(data).reshape(-1)
+    if dtype is None:
+        dtype = _edges_dtype(data)
+    if weights is not None:
+        weights = np.asarray(weights).reshape(-1)
+        if weights.shape != data.shape:
+            raise ValueError("weights should have the same shape as data.")
+    nbins = int(nbins)
+    nseries = int(nseries)
+    nsamples = data.size//nseries if nseries else 0
+    if nseries != 1 and not nsamples:
+        counts = np.zeros((nseries, nbins), int if weights is None else float)
+        return np.array((counts, counts)) if sumw2 else counts
+    if nseries > 1 and nsamples >= _BLOCKSIZE:
+        # long series are counted one by one
+        rows = data.reshape(nseries, nsamples)
+        wrows = [None]*nseries if weights is None else weights.reshape(nseries, nsamples)
+        counts = np.array([_uniform_counts(row, nbins, vmin, vmax, w, sumw2=sumw2,
+                                           dtype=dtype)
+                           for row, w in zip(rows, wrows)])
+        return counts.swapaxes(0, 1) if sumw2 else counts
+
+    if nseries > 1:
+        # short series: the blocks are made of whole series and each series
+        # has its own nbins+2 counts
+        nrows = _BLOCKSIZE//nsamples
+        blocksize = nrows*nsamples
+        offsets = np.repeat(np.arange(nrows)*(nbins+2), nsamples)
+    else:
+        blocksize = _BLOCKSIZE
+
+    binner = _UniformBins(nbins, vmin, vmax, min(blocksize, data.size), dtype)
+    # one row of counts for the weights and one for the squared weights
+    nw = 2 if (sumw2 and weights is not None) else 1
+    counts = np.zeros((nw, nseries*(nbins+2)), int if weights is None else float)
+
+    for i in range(0, data.size, blocksize):
+        block = data[i:i+blocksize]
+        n = block.size
+        ix = binner.index(block)
+        w = None if weights is None else weights[i:i+blocksize]
+        if nseries > 1:
+            ix += offsets[:n]
+            start = i//nsamples*(nbins+2)
+            stop = start+n//nsamples*(nbins+2)
+        else:
+            start, stop = 0, nbins+2
+        counts[0, start:stop] += np.bincount(ix, w, minlength=stop-start)
+        if nw > 1:
+            counts[1, start:stop] += np.bincount(ix, w*w, minlength=stop-start)
+
+    if nseries > 1:
+        counts = counts.reshape(nw, nseries, nbins+2)[..., 1:-1]
+    else:
+        counts = counts[:, 1:-1]
+    if sumw2:
+        return counts if nw > 1 else np.array((counts[0], counts[0]))
+    return counts[0]
+
+def _auto_fast_bins(data, bin_range=None, seed=0, samplesize=AUTOFAST_SAMPLESIZE):
+    """ number of bins and range for bins="auto-fast"
+
+    The bin width is the one of the numpy "auto" method (the minimum of
+    the Freedman Diaconis and Sturges widths) but the interquartile range
+    is estimated on samplesize values drawn with the seed. Only the range,
+    if not given, needs a pass on the data.
+    return nbins, (min, max)
+    """
+    if _is_streamed(data) and not isinstance(data, np.ndarray):
+        raise ValueError("bins='%s' needs an array or a np.memmap, not an iterator"%AUTOFAST)
+    data = np.asarray(data).reshape(-1)
+    vmin, vmax = _uniform_range(data, bin_range)
+    size = data.size
+
+    if size > samplesize:
+        index = np.random.RandomState(seed).randint(0, size, samplesize)
+        index.sort() # contiguous reads for a np.memmap
+        sample = data[index]
+    else:
+        sample = np.asarray(data)
+    # the values in range, NaN are removed
+    sample = sample[(sample >= vmin) & (sample <= vmax)]
+    if not sample.size:
+        return 1, (vmin, vmax)
+    # number of values in range, estimated
+    n = sample.size if size <= samplesize else size*sample.size/samplesize
+
+    width = (vmax-vmin)/(np.log2(n)+1.0)
+    iqr = np.subtract(*np.percentile(sample, [75, 25]))
+    if iqr:
+        width = min(width, 2.0*iqr*n**(-1.0/3.0))
+    return max(1, int(np.ceil((vmax-vmin)/width))), (vmin, vmax)
+
+def _uniform_histogram(data, nbins, bin_range=None, weights=None, sumw2=False):
+    """ np.histogram for an int number of bins, see _uniform_counts
+
+    None in bin_range are replaced by the data min, max computed in one pass.
+    return counts, edges
+    """
+    data = np.asarray(data)
+    vmin, vmax = _uniform_range(data, bin_range)
+    counts = _uniform_counts(data, nbins, vmin, vmax, weights, sumw2=sumw2)
+    return counts, _uniform_edges(nbins, vmin, vmax, _edges_dtype(data))
+
+def _stream_histogram(data, bins, bin_range, weights, chunksize, workers=None,
+                      sumw2=False):
+    """ histogram of streamed data (see _is_streamed) accumulated by chunks
+
+    The chunks of a np.memmap are histogrammed by workers (see
+    _map_chunks), the chunks of an iterator are always read in order.
+    return the counts and the bin edges as np.histogram, the counts are
+    stacked with the sum of squared weights if sumw2 (see _uniform_counts)
+    """
+    if hasattr(bins, "__iter__"):
+        nbins, edges = None, np.asarray(bins, dtype=float)
+    else:
+        if not isinstance(data, np.ndarray) and (bin_range is None or None in bin_range):
+            raise ValueError("histogram of an iterator of chunks needs the bins edges or a range")
+        vmin, vmax = _uniform_range(data, bin_range, chunksize)
+        nbins = int(bins)
+        # the dtype of the chunks of an iterator is not known yet
+        dtype = _edges_dtype(data)
+        edges = _uniform_edges(nbins, vmin, vmax, dtype)
+
+    if nbins is None:
+        counter = lambda chunk, w: _edges_counts(chunk, edges, w, sumw2=sumw2)
+    else:
+        counter = lambda chunk, w: _uniform_counts(chunk, nbins, vmin, vmax, w,
+                                                   sumw2=sumw2, dtype=dtype)
+
+    chunks = _iter_weights(weights, _iter_chunks(data, chunksize))
+    if workers is not None and isinstance(data, np.ndarray):
+        parts = _map_chunks(counter, list(chunks), workers)
+    else:
+        parts = (counter(chunk, w) for chunk, w in chunks)
+    m = _sum_counts(parts)
+    if m is None:
+        m = _zero_counts(len(edges)-1, weights, sumw2)
+    return m, edges
+
+def _zero_counts(nbins, weights, sumw2):
+    """ the counts of no data """
+    m = np.zeros(nbins, int if weights is None else float)
+    return np.array((m, m)) if sumw2 else m
+
+def _map_chunks(func, chunks, workers):
+    """ [func(*args) for args in chunks] computed in parallel threads
+
+    workers is a number of threads or an executor (see _submit).
+    The numpy kernels release the GIL on large arrays.
+    """
+    if isinstance(workers, int):
+        if workers <= 1:
+            return [func(*args) for args in chunks]
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(workers)
+        try:
+            return _map_chunks(func, chunks, pool)
+        finally:
+            pool.close()
+    results = [_submit(workers, func, *args) for args in chunks]
+    return [result() for result in results]
+
+def _sum_counts(parts):
+    """ sum of the partial counts in order, None if there is no parts """
+    m = None
+    for h in parts:
+        if m is None:
+            m = h
+        else:
+            m += h
+    return m
+
+def _split_chunks(size, workers):
+    """ slices splitting size values in one chunk per worker thread, or in
+    chunks of CHUNKSIZE for an executor
+    """
+    if isinstance(workers, int):
+        chunksize = -(-size//max(workers, 1))
+    else:
+        chunksize = CHUNKSIZE
+    chunksize = max(chunksize, 1)
+    return [slice(i, i+chunksize) for i in range(0, size, chunksize)]
+
+def _parallel_histogram(data, bins, bin_range, weights, workers, sumw2=False):
+    """ np.histogram computed by workers on chunks of data, see _map_chunks
+
+    return counts, edges. The counts are stacked with the sum of squared
+    weights if sumw2 (see _uniform_counts)
+    """
+    data = np.asarray(data).reshape(-1)
+    if weights is not None:
+        weights = np.asarray(weights).reshape(-1)
+        if weights.shape != data.shape:
+            raise ValueError("weights should have the same shape as data.")
+    slices = _split_chunks(data.size, workers)
+    chunks = [(data[s], None if weights is None else weights[s]) for s in slices]
+
+    if hasattr(bins, "__iter__"):
+        edges = np.asarray(bins)
+        if sumw2:
+            counter = lambda chunk, w: _edges_counts(chunk, edges, w, sumw2=True)
+        else:
+            counter = lambda chunk, w: np.histogram(chunk, edges, weights=w)[0]
+    else:
+        nbins = int(bins)
+        vmin, vmax = bin_range if bin_range is not None else (None, None)
+        if vmin is None or vmax is None:
+            ranges = _map_chunks(lambda chunk, w: _stream_range(chunk, _BLOCKSIZE),
+                                 chunks, workers)
+            dmin, dmax = _data_range(min([r[0] for r in ranges] or [np.inf]),
+                                     max([r[1] for r in ranges] or [-np.inf]))
+            vmin = dmin if vmin is None else vmin
+            vmax = dmax if vmax is None else vmax
+        vmin, vmax = _uniform_range(None, (vmin, vmax))
+        edges = _uniform_edges(nbins, vmin, vmax, _edges_dtype(data))
+        counter = lambda chunk, w: _uniform_counts(chunk, nbins, vmin, vmax, w,
+                                                   sumw2=sumw2)
+
+    m = _sum_counts(_map_chunks(counter, chunks, workers))
+    if m is None:
+        m = _zero_counts(len(edges)-1, weights, sumw2)
+    return m, edges
+
+class _BinedGeometry(object):
+    """ geometry of the bars and of the fill polygon of a binned plot
+
+    Only what an artist reads is computed, when it is first read (see the
+    aliases set by _makebinedstatplot). The arrays keep the dtype of the
+    bins and of the statistic (e.g. float32). After an in place change
+    of hist, update() makes the polygon computed again in the same buffer.
+    """
+    __slots__ = ("bins", "hist", "bottom", "align", "dr", "stacked", "log",
+                 "_x", "_y", "_base", "_width", "_stale")
+
+    def __init__(self, bins, hist, bottom, align, dr, stacked, log):
+        self.bins = bins
+        self.hist = hist
+        self.bottom = bottom
+        self.align = align
+        self.dr = dr
+        self.stacked = stacked
+        self.log = log
+        self._x = self._y = self._base = self._width = None
+        self._stale = True
+
+    def update(self):
+        """ the hist array changed in place, the polygon top must be recomputed """
+        self._stale = True
+
+    def base(self, p=None):
+        if self.bottom is not None:
+            return self.bottom
+        if self._base is None:
+            self._base = np.zeros(len(self.hist), self.hist.dtype)
+        return self._base
+
+    def width(self, p=None):
+        if self._width is None:
+            self._width = np.diff(self.bins)
+            if self.dr != 1.0:
+                self._width *= self.dr
+        return self._width
+
+    def fill_x(self, p=None):
+        if self._x is not None:
+            return self._x
+        bins = self.bins
+        n = len(bins)
+        # these define the perimeter of the polygon
+        x = np.empty(4*n-3, np.result_type(bins, self.hist))
+        x[0:2*n-1:2], x[1:2*n-1:2] = bins, bins[:-1]
+        x[2*n-1:] = x[1:2*n-1][::-1]
+
+        if self.align == 'left' or self.align == 'center':
+            x -= 0.5*(bins[1]-bins[0])
+        elif self.align == 'right':
+            x += 0.5*(bins[1]-bins[0])
+        self._x = x
+        return x
+
+    def fill_y(self, p=None):
+        if not self._stale:
+            return self._y
+        n = len(self.bins)
+        m = self.hist
+        y = self._y
+        if y is None:
+            y = self._y = np.empty(4*n-3, np.result_type(self.bins, m))
+
+        base = self.base()
+        y[0] = 0
+        y[1:2*n-1:2], y[2:2*n:2] = base, base
+        y[2*n-1:] = y[1:2*n-1][::-1]
+
+        if self.log:
+            # Setting a minimum of 0 results in problems for log plots
+            # one full tick-label unit below the lowest filled bin
+            positive = m[m > 0]
+            minimum = positive.min()/10. if positive.size else 0.1
+            y[0], y[-1] = minimum, minimum
+
+        if self.stacked:
+            # starting point for drawing polygon
+            y[0] = y[1]
+        # set the top of this polygon
+        np.add(m, base, out=y[1:2*n-1:2])
+        y[2:2*n:2] = y[1:2*n-1:2]
+        if self.log:
+            y[y < minimum] = minimum
+        self._stale = False
+        return y
 
 def _makebinedstatplot(plot, m, bins, err):
 
@@ -186,7 +788,9 @@ def _makebinedstatplot(plot, m, bins, err):
     #di index dd data can be "x", "y" or "y", "x"
     di, dd = plot._get_direction()
 
-    totwidth = np.diff(bins)
+    bins = np.asarray(bins)
+    # float centers and geometry for int edges (e.g. bins=[0, 1, 2])
+    fbins = bins if bins.dtype.kind == "f" else bins.astype(float)
 
     if rwidth is not None:
         dr = min(1.0, max(0.0, rwidth))
@@ -194,34 +798,33 @@ def _makebinedstatplot(plot, m, bins, err):
         dr = 1.0
 
     if not stacked:
-        boffset = (rsep*count+roffset)*totwidth
+        shift = rsep*count+roffset
     else:
-        boffset = roffset*totwidth
+        shift = roffset
 
-
-    width = dr*totwidth
-
-
-    realx = (bins[:-1]+bins[1:])/2.
-    if align in ['mid', "center"]:
+    realx = fbins[:-1]+fbins[1:]
+    realx *= 0.5
+    if align in ['mid', "center"] or dr == 1.0:
         xbins = realx
     elif align == 'right':
-        xbins = (realx+(totwidth*(1.-dr))/2.)
+        xbins = realx+np.diff(fbins)*((1.-dr)/2.)
     else:
-        xbins = (realx-(totwidth*(1.-dr))/2.)
+        xbins = realx-np.diff(fbins)*((1.-dr)/2.)
 
-    if bottom is None:
-        bottom = np.zeros(len(m), np.float)
-    if stacked:
+    if stacked and bottom is not None:
         height = m - bottom
     else:
         height = m
 
-    #xbin = (bins[:-1]+bins[1:])/2.
-    oxbins = xbins+boffset
+    if shift:
+        oxbins = xbins+np.diff(fbins)*shift
+    else:
+        oxbins = xbins
 
     hist_plot = height*amplitude
 
+    geometry = _BinedGeometry(fbins, m, bottom, align, dr, stacked, log)
+
     plot.update({di:oxbins, dd:hist_plot,
                  dd+"min":0, dd+"max":alias("y"),
                  dd+"err":err
@@ -230,14 +833,15 @@ def _makebinedstatplot(plot, m, bins, err):
                 last=alias("y"),
                 lasty=alias("y"),
                 count=count+1,
+                geometry=geometry
                )
     plot.step.update(where="mid")
 
-
+    # the bars and polygon geometry is computed only if they are drawn
     plot.bar.update(align="center",
                     edge=oxbins,
-                    height=hist_plot, width=width,
-                    base=bottom, rwidth=1.0,
+                    height=hist_plot, width=alias(geometry.width, "bins width"),
+                    base=alias(geometry.base, "bottom"), rwidth=1.0,
                     yerr=None, xerr=None
                    )
     plot.fillstep.update(x=realx)
@@ -247,104 +851,483 @@ def _makebinedstatplot(plot, m, bins, err):
                              data2=alias("y")
                             )
 
+    plot.fill.update({di:alias(geometry.fill_x, "polygon"),
+                      dd:alias(geometry.fill_y, "polygon")})
 
-    #if di == "x":
-    #    plot.update(left=alias("edge"), bottom=alias("base"),
-    #                height=alias("length"))
-    #else:
-    #    plot.update(left=alias("base"), bottom=alias("left"),
-    #                height=alias("length"))
 
 
 
-    # these define the perimeter of the polygon
-    x = np.zeros(4 * len(bins) - 3, np.float)
-    y = np.zeros(4 * len(bins) - 3, np.float)
+@histogram.decorate()
+def _histogram_counts(plot, *args, **kwargs):
+    """ histogram plot made from already computed counts, see histograms """
+    plot.update(kwargs.pop(KWS,{}), **kwargs)
+    (counts, bins, density, data, sumw2) = plot.parseargs(args,
+             "counts", "bins", "density", "data", "sumw2",
+             density=False, data=None, sumw2=None)
+    _histogram_plot(plot, data, np.asarray(counts), np.asarray(bins), density,
+                    sumw2)
+    plot.goifgo()
 
-    x[0:2*len(bins)-1:2], x[1:2*len(bins)-1:2] = bins, bins[:-1]
-    x[2*len(bins)-1:] = x[1:2*len(bins)-1][::-1]
+def _edges_counts(data, edges, weights=None, nseries=1, sumw2=False):
+    """ same as _uniform_counts for an array of bin edges """
+    data = np.asarray(data).reshape(-1)
+    if weights is not None:
+        weights = np.asarray(weights).reshape(-1)
+    nbins = len(edges)-1
+    if nseries != 1 and not data.size:
+        counts = np.zeros((nseries, nbins), int if weights is None else float)
+        return np.array((counts, counts)) if sumw2 else counts
+    # 0 and nbins+1 are the under and overflow, NaN goes in the overflow
+    index = np.searchsorted(edges, data, "right")
+    index[data == edges[-1]] = nbins
+    if nseries > 1:
+        index += np.arange(data.size)//(data.size//nseries)*(nbins+2)
+    counts = np.bincount(index, weights, minlength=nseries*(nbins+2))
+    if sumw2:
+        counts = np.array((counts, counts if weights is None else
+                           np.bincount(index, weights*weights,
+                                       minlength=nseries*(nbins+2))))
+    if nseries > 1:
+        return counts.reshape(counts.shape[:-1]+(nseries, nbins+2))[..., 1:-1]
+    return counts[..., 1:-1]
+
+def _batch_counts(data, bins, bin_range, weights, sumw2=False):
+    """ histograms with shared bins of the rows of a 2d array
+
+    The counts of all rows are computed in one pass.
+    return counts (nseries, nbins), edges. The counts are stacked with the
+    sum of squared weights if sumw2 (see _uniform_counts)
+    """
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise ValueError("data must be a 2d array of series x samples, got a %dd array"%data.ndim)
+    if weights is not None:
+        weights = np.broadcast_to(weights, data.shape).reshape(-1)
+
+    if hasattr(bins, "__iter__"):
+        edges = np.asarray(bins, dtype=float)
+        counts = _edges_counts(data, edges, weights, data.shape[0], sumw2)
+    else:
+        vmin, vmax = _uniform_range(data, bin_range)
+        counts = _uniform_counts(data, bins, vmin, vmax, weights, data.shape[0],
+                                 sumw2)
+        edges = _uniform_edges(bins, vmin, vmax, _edges_dtype(data))
+    return counts, edges
+
+def histograms(data, bins=10, range=None, weights=None, density=False, **kwargs):
+    """ histograms of many series with shared bins, computed in one pass
+
+    Parameters
+    ----------
+    data : 2d array like
+        series x samples, each row is histogrammed
+    bins, range, density :
+        as histogram, the bins are the same for all series. If bins is an
+        integer and range is not given the min, max of all data are taken.
+    weights : array like, optional
+        weights of the same shape than data, or broadcastable to it (e.g.
+        one weight per sample shared by all series)
+    **kwargs :
+        plots parameters, a list is cycled over the series
+        (e.g. color=["red", "blue"]), see RecObject.itercall
 
-    if bottom is None:
-        bottom = np.zeros(len(bins)-1, np.float)
+    Returns
+    -------
+    list of XYPlot : the histogram plots of each series, the same as given
+        by histogram(row, bins=edges)
 
-    y[1:2*len(bins)-1:2], y[2:2*len(bins):2] = bottom, bottom
-    y[2*len(bins)-1:] = y[1:2*len(bins)-1][::-1]
+    See histogramstack to plot all series as one image.
+    """
+    data = np.asarray(data)
+    counts, edges = _batch_counts(data, bins, range, weights, weights is not None)
+    factory = _histogram_counts.derive(bins=edges, density=density)
+    if weights is not None:
+        counts, sumw2 = counts
+        kwargs["sumw2"] = list(sumw2)
+    return list(factory.itercall(len(counts), counts=list(counts),
+                                 data=list(data), **kwargs))
 
-    if log:
-        # Setting a minimum of 0 results in problems for log plots
-        if density or weights is not None:
-            # For normed data, set to log base * minimum data value
-            # (gives 1 full tick-label unit for the lowest filled bin)
-            ndata = np.array(n)
-            minimum = (np.min(ndata[ndata > 0])) / logbase
-        else:
-            # For non-normed data, set the min to log base,
-            # again so that there is 1 full tick-label unit
-            # for the lowest bin
-            minimum = 1.0 / logbase
+@xyzplot.decorate()
+def histogramstack(plot, *args, **kwargs):
+    """ histograms of many series with shared bins, stacked in one image
+
+    data is a 2d array of series x samples, the other parameters are the
+    same than for histograms. The counts are in "hist" (series x bins),
+    x is the bin edges and y the series edges (0 to number of series).
+    All the series are drawn by a single artist with imshow, pcolormesh,
+    etc.
+    """
+    plot.update(kwargs.pop(KWS, {}), **kwargs)
+    (data, bins, bin_range, weights, density) = plot.parseargs(args,
+             "data", "bins", "range", "weights", "density",
+             bins=10, range=None, weights=None, density=False)
 
-        y[0], y[-1] = minimum, minimum
+    counts, xedges = _batch_counts(data, bins, bin_range, weights,
+                                   weights is not None)
+    if weights is not None:
+        counts, sumw2 = counts
     else:
-        minimum = np.min(bins)
-
-    if align == 'left' or align == 'center':
-        x -= 0.5*(bins[1]-bins[0])
-    elif align == 'right':
-        x += 0.5*(bins[1]-bins[0])
+        sumw2 = counts
+    h = counts.astype(float)
+    if density:
+        h = h/np.diff(xedges)/h.sum(axis=1)[:, None]
+    yedges = np.arange(len(h)+1, dtype=float)
 
-    # If fill kwarg is set, it will be passed to the patch collection,
-    # overriding this
+    plot.update(xedges=xedges, yedges=yedges, hist=h,
+                sumw2=sumw2.astype(float),
+                x=alias("xedges"), y=alias("yedges")
+                )
+    _set_grid(plot, xedges, yedges, h)
+    plot.goifgo()
 
-    xvals, yvals = [], []
 
-    if stacked:
-        # starting point for drawing polygon
-        y[0] = y[1]
-        # top of the previous polygon becomes the bottom
-        y[2*len(bins)-1:] = y[1:2*len(bins)-1][::-1]
-    # set the top of this polygon
-    y[1:2*len(bins)-1:2], y[2:2*len(bins):2] = (m + bottom,
-                                                m + bottom)
-    if log:
-        y[y < minimum] = minimum
+class LiveHistogram(object):
+    """ A histogram plot updated in place with new data, for live figures
 
-    plot.fill.update({di:x, dd:y})
+    The bins are fixed at creation: an array of edges or a number of bins
+    with a range. All the other arguments are the ones of histogram.
+    Or give a plot already made by histogram with plot=.
 
+    draw(*go) draws the plot (see RecObject.go) and records the matplotlib
+    artists. add(data) adds the new data to the counts, updates the plot
+    arrays (hist, y, yerr, bar heights, fill polygon) in place and the
+    recorded artists, nothing is re-created.
 
+    Example:
+        live = LiveHistogram(bins=40, range=(-4,4))
+        live.draw("axes", "step", "fill")
+        for chunk in chunks:
+            live.add(chunk)
+            plt.pause(0.1)
+    """
+    def __init__(self, data=None, bins=10, range=None, plot=None, **kwargs):
+        if plot is None:
+            if not hasattr(bins, "__iter__"):
+                if range is None or None in range:
+                    raise ValueError("LiveHistogram needs the bins edges or a range")
+                bins = np.linspace(range[0], range[1], int(bins)+1)
+            if data is None:
+                data = np.zeros(0)
+            plot = histogram(data, bins=bins, **kwargs)
+
+        elif "counts" not in plot:
+            raise ValueError("The plot given does not seems to be from a histogram plot factory")
+        if plot.get("stacked", False):
+            raise ValueError("LiveHistogram cannot update a stacked histogram")
+        self.plot = plot
+        self.artists = {}
+
+    def draw(self, *go, **kwargs):
+        """ plot.go(*go, **kwargs) and record the artists, return the go output """
+        output = self.plot.go(*go, **kwargs)
+        self.artists.update((k, a) for k, a in output.iteritems() if k)
+        return output
+
+    def add(self, data, weights=None, autoscale=True):
+        """ add data to the histogram and update the plot and the artists
+
+        if autoscale is True the axes of the artists are rescaled
+        """
+        plot = self.plot
+        edges = plot["bins"]
+        h, h2 = _edges_counts(data, edges, weights, sumw2=True)
+
+        counts, sumw2 = plot["counts"], plot["sumw2"]
+        counts += h
+        sumw2 += h2
+
+        m = plot["hist"]
+        err = np.sqrt(sumw2)
+        if plot.get("density", False):
+            norm = np.diff(edges)*counts.sum()
+            m[:] = counts/norm
+            err /= norm
+        else:
+            m[:] = counts
+
+        di, dd = plot._get_direction()
+        # the plotted height is also the bar height
+        plot[dd][:] = m*plot.get("amplitude", 1)
+        if plot.get(dd+"err", None) is not None:
+            plot[dd+"err"][:] = err
+
+        # the fill polygon is computed again when read, see _makebinedstatplot
+        plot["geometry"].update()
+
+        self._update_artists(dd)
+        if autoscale:
+            for ax in set(a.axes for a in _flat_artists(self.artists.values())
+                          if getattr(a, "axes", None) is not None):
+                ax.relim()
+                ax.autoscale_view()
+
+    def _update_artists(self, dd):
+        for key, artists in self.artists.iteritems():
+            func = self.plot
+            for attr in key.strip(".").split("."):
+                func = getattr(func, attr)
+
+            if isinstance(artists, ErrorbarContainer):
+                self._update_errorbar(artists, func, dd)
+            elif isinstance(artists, BarContainer):
+                for rect, h in zip(artists, func["height"]):
+                    if dd == "y":
+                        rect.set_height(h)
+                    else:
+                        rect.set_width(h)
+            else:
+                for artist in _flat_artists([artists]):
+                    if isinstance(artist, Line2D):
+                        artist.set_data(func["x"], func["y"])
+                    elif isinstance(artist, Polygon):
+                        artist.set_xy(np.column_stack((func["x"], func["y"])))
+
+    @staticmethod
+    def _update_errorbar(container, func, dd):
+        line, caplines, barcols = container.lines
+        x, y = func["x"], func["y"]
+        if line is not None:
+            line.set_data(x, y)
+        err = func.get(dd+"err", None)
+        if err is None or not barcols:
+            return
+        if dd == "y":
+            lo, up = y-err, y+err
+            segs = [((xi, l), (xi, u)) for xi, l, u in zip(x, lo, up)]
+            caps = [(x, lo), (x, up)]
+        else:
+            lo, up = x-err, x+err
+            segs = [((l, yi), (u, yi)) for yi, l, u in zip(y, lo, up)]
+            caps = [(lo, y), (up, y)]
+        # the dd errors are drawn by the last bar collection
+        barcols[-1].set_segments(segs)
+        for cap, (cx, cy) in zip(caplines[-2:], caps):
+            cap.set_data(cx, cy)
+
+def _flat_artists(lst):
+    for a in lst:
+        if isinstance(a, (list, tuple)):
+            for sub in _flat_artists(a):
+                yield sub
+        else:
+            yield a
+
+
+def _histogram2d_edges(x, y, bins, bin_range):
+    """ the x and y edges np.histogram2d would use """
+    try:
+        N = len(bins)
+    except TypeError:
+        N = 1
+    if N != 2:
+        bins = [bins, bins]
+    if bin_range is None:
+        bin_range = [None, None]
+
+    edges = []
+    for data, b, r in zip((x, y), bins, bin_range):
+        if hasattr(b, "__iter__"):
+            edges.append(np.asarray(b))
+            continue
+        origin = "supplied"
+        if r is None:
+            data = np.asarray(data)
+            r = (data.min(), data.max()) if data.size else (0, 1)
+            origin = "autodetected"
+        smin, smax = r
+        if not (np.isfinite(smin) and np.isfinite(smax)):
+            raise ValueError("%s range of [%s, %s] is not finite"%(origin, smin, smax))
+        if smin == smax:
+            smin, smax = smin-0.5, smax+0.5
+        edges.append(np.linspace(smin, smax, int(b)+1))
+    return edges
+
+def _bins_index(edges):
+    """ the bins index of edges: arithmetic for uniform edges """
+    nbins = len(edges)-1
+    if nbins > 0 and np.array_equal(edges, np.linspace(edges[0], edges[-1], nbins+1)):
+        return _UniformBins(nbins, edges[0], edges[-1])
+    return _EdgesBins(edges)
+
+def _sum_keys(keys, w=None):
+    """ sorted unique keys and the count, or sum of weights, of each key """
+    if w is None:
+        keys = np.sort(keys)
+    else:
+        # stable, the weights are summed in order as np.bincount does
+        order = np.argsort(keys, kind="mergesort")
+        keys, w = keys[order], w[order]
+    if not keys.size:
+        return keys, np.zeros(0)
+    flag = np.empty(keys.size, bool)
+    flag[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=flag[1:])
+    start = np.flatnonzero(flag)
+    if w is None:
+        sums = np.diff(np.append(start, keys.size)).astype(float)
+    else:
+        sums = np.add.reduceat(w, start).astype(float)
+    return keys[start], sums
 
+def _histogram2d_part(x, y, w, xedges, yedges, sparse, chunksize):
+    """ the 2d counts of points, flatten in a (nx*ny,) array or, if sparse,
+    as (keys, sums) of the non empty bins. key is ix*ny+iy
+    """
+    bx, by = _bins_index(xedges), _bins_index(yedges)
+    nx, ny = bx.nbins, by.nbins
+    size = nx*ny
+    h = None if sparse else np.zeros(size)
+    pending, npending, nmerged = [], 0, 0
+
+    for i in range(0, x.size, chunksize):
+        keys, weights = [], []
+        for j in range(i, min(i+chunksize, x.size), _BLOCKSIZE):
+            s = slice(j, min(j+_BLOCKSIZE, i+chunksize))
+            ix, iy = bx.index(x[s]), by.index(y[s])
+            # drop the under and overflows (and NaN)
+            keep = (ix > 0) & (ix <= nx) & (iy > 0) & (iy <= ny)
+            keys.append(ix[keep]*ny+iy[keep]-(ny+1))
+            if w is not None:
+                weights.append(w[s][keep])
+        keys = np.concatenate(keys)
+        weights = None if w is None else np.concatenate(weights)
+
+        if not sparse and size <= 4*keys.size:
+            # small grid: a bincount of the whole grid is cheaper than a sort
+            h += np.bincount(keys, weights, minlength=size)
+            continue
+        keys, sums = _sum_keys(keys, weights)
+        if not sparse:
+            h[keys] += sums
+            continue
+        pending.append((keys, sums))
+        npending += keys.size
+        # merge the sparse counts, amortized on the number of non empty bins
+        if npending > max(chunksize, 2*nmerged):
+            pending = [_merge_keys(pending)]
+            npending = nmerged = pending[0][0].size
+    if sparse:
+        return _merge_keys(pending)
+    return h
+
+def _merge_keys(parts):
+    """ merge a list of (keys, sums) in one """
+    parts = [part for part in parts if part[0].size]
+    if len(parts) == 1:
+        return parts[0]
+    if not parts:
+        return np.zeros(0, np.intp), np.zeros(0)
+    return _sum_keys(np.concatenate([k for k, _ in parts]),
+                     np.concatenate([v for _, v in parts]))
+
+def _histogram2d_counts(x, y, bins=10, range=None, normed=False, weights=None,
+                       workers=None, sparse=False, chunksize=CHUNKSIZE):
+    """ same as np.histogram2d, computed by chunks of points
+
+    The bin of each point is linearized in ix*ny+iy and counted with
+    np.bincount, or by sorting when the grid is much larger than a chunk.
+    Integer counts are identical to np.histogram2d.
+
+    workers is a number of threads or an executor (see histogram). The
+    points are split in chunks histogrammed with the same edges and the
+    partial counts are summed.
+    If sparse is True h is a scipy.sparse.coo_matrix of the non empty bins
+    and the (nx, ny) dense array is never built.
+    return h, xedges, yedges
+    """
+    if sparse:
+        try:
+            from scipy.sparse import coo_matrix
+        except ImportError:
+            raise TypeError("sparse=True needs scipy.sparse")
+    x = np.asarray(x).reshape(-1)
+    y = np.asarray(y).reshape(-1)
+    if x.size != y.size:
+        raise ValueError("x and y must have the same size got %d and %d"%(x.size, y.size))
+    if weights is not None:
+        weights = np.asarray(weights).reshape(-1)
+    xedges, yedges = _histogram2d_edges(x, y, bins, range)
+    nx, ny = len(xedges)-1, len(yedges)-1
+
+    counter = lambda xc, yc, w: _histogram2d_part(xc, yc, w, xedges, yedges,
+                                                   sparse, chunksize)
+    if workers is None:
+        parts = [counter(x, y, weights)]
+    else:
+        chunks = [(x[s], y[s], None if weights is None else weights[s])
+                  for s in _split_chunks(x.size, workers)]
+        parts = _map_chunks(counter, chunks, workers)
+
+    if not sparse:
+        h = _sum_counts(parts)
+        h = np.zeros(nx*ny) if h is None else h
+        h = h.reshape(nx, ny)
+        if normed:
+            # as np.histogramdd
+            h = h/np.diff(xedges)[:, None]/np.diff(yedges)[None, :]/h.sum()
+        return h, xedges, yedges
+
+    keys, sums = _merge_keys(parts)
+    row, col = keys//ny, keys%ny
+    if normed:
+        sums = sums/np.diff(xedges)[row]/np.diff(yedges)[col]/sums.sum()
+    return coo_matrix((sums, (row, col)), shape=(nx, ny)), xedges, yedges
+
+def _histogram2d_image(h, cmin=None, cmax=None):
+    """ the (ny, nx) image of a 2d histogram, values outside cmin, cmax
+    are set to NaN in place. A sparse histogram is made dense
+    """
+    if not isinstance(h, np.ndarray):
+        h = h.toarray()
+    if cmin is not None:
+        h[h < cmin] = np.nan
+    if cmax is not None:
+        h[h > cmax] = np.nan
+    return h.T
+
+def _set_grid(plot, xedges, yedges, image):
+    """ set the (ny, nx) image of a 2d histogram in colors and Z, with the
+    bins corners in X, Y and the contour and imshow parameters. X, Y are
+    views on the edges, the grid is not stored. If image is an alias
+    (e.g. a memo of a dense image), Z is an alias of colors.
+    """
+    ny, nx = len(yedges)-1, len(xedges)-1
+    plot.update(X=np.broadcast_to(xedges[:-1], (ny, nx)),
+                Y=np.broadcast_to(yedges[:-1, None], (ny, nx)),
+                colors=image,
+                Z=alias("colors") if isinstance(image, alias) else image
+                )
+    plot.contour.update(colors=None)
+    plot.contourf.update(colors=None)
+    plot.imshow.update(extent=(xedges.min(),xedges.max(),yedges.min(),yedges.max()))
 
 @xyzplot.decorate()
 def histogram2d(plot, *args, **kwargs):
     plot.update(kwargs.pop(KWS, {}), **kwargs)
     (x, y,
     bins, bin_range, normed, weights,
-    cmin, cmax) = plot.parseargs(args, "x", "y",
+    cmin, cmax, workers, sparse) = plot.parseargs(args, "x", "y",
                         "bins", "range", "normed", "weights",
-                        "cmin", "cmax",
+                        "cmin", "cmax", "workers", "sparse",
                         bins=10, range=None, normed=False, weights=None,
-                        cmin=None, cmax=None)
+                        cmin=None, cmax=None, workers=None, sparse=False)
 
 
-    h, xedges, yedges = np.histogram2d(x, y, bins=bins, range=bin_range,
-                                       normed=normed, weights=weights)
-
-    if cmin is not None:
-        h[h < cmin] = None
-    if cmax is not None:
-        h[h > cmax] = None
-
-    X, Y = np.meshgrid(xedges, yedges)
+    h, xedges, yedges = _histogram2d_counts(x, y, bins, bin_range, normed,
+                                            weights, workers, sparse)
 
+    if sparse:
+        # the dense image is built only when a plot needs it
+        image = alias(lambda p: _histogram2d_image(p["hist"], p.get("cmin", None),
+                                                   p.get("cmax", None)),
+                      memo=True)
+    else:
+        image = _histogram2d_image(h, cmin, cmax)
 
     plot.update(xedges=xedges, yedges=yedges, hist=h,
-                x=alias("xedges"), y=alias("yedges"),
-                X=X[:-1,:-1], Y=Y[:-1,:-1],
-                colors=h.T,
-                Z = h.T
+                x=alias("xedges"), y=alias("yedges")
                 )
-    plot.contour.update(colors=None)
-    plot.contourf.update(colors=None)
-    plot.imshow.update(extent=(xedges.min(),xedges.max(),yedges.min(),yedges.max()))
+    _set_grid(plot, xedges, yedges, image)
     plot.goifgo()
 
 
@@ -352,8 +1335,10 @@ histogram["_example_"] = ("histogram", None)
 
 DataPlot.histogram = histogram
 
-ImgPlot.histogram = histogram.derive(data=alias(lambda p: np.asarray(p["img"]).flatten()))
-XYZPlot.histogram = histogram.derive(data=alias(lambda p: np.asarray(p["z"]).flatten()))
+ImgPlot.histogram = histogram.derive(data=alias(lambda p: np.asarray(p["img"]).flatten(),
+                                                memo=True))
+XYZPlot.histogram = histogram.derive(data=alias(lambda p: np.asarray(p["z"]).flatten(),
+                                                memo=True))
 
 
 XYPlot.yhistogram2y = histogram.derive(data=alias("y"),
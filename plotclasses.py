@@ -401,10 +401,11 @@ class _subdata(object):
         except KeyError:
             pass
         else:
-            if is_scalar:
-                new["index"] = _make_array(x)[item]
-            else:
-                new["indexes"] = _make_array(x)[item]
+            if x is not None:
+                if is_scalar:
+                    new["index"] = _make_array(x)[item]
+                else:
+                    new["indexes"] = _make_array(x)[item]
 
         try:
             weights = dataplot["weights"]
@@ -561,7 +562,8 @@ class ImgPlot(PlotFactory, _BaseFigAxes):
 
 
     imshow = pfs.imshow
-    hist = pfs.hist.derive(data=alias(lambda p: np.asarray(p["img"]).flatten(), "-> img.flatten()"))
+    hist = pfs.hist.derive(data=alias(lambda p: np.asarray(p["img"]).flatten(), "-> img.flatten()",
+                                      memo=True))
     colorbar = pfs.colorbar
 
     sub = _subimg()
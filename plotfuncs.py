@@ -1655,14 +1655,35 @@ def contourf(*args, **kwargs):
 setpfdoc(contourf, plt.Axes.contourf.__doc__, "contourf")
 
 hist2d = pcolorfast.derive(2, "x", "y", "bins", "range", "normed", "weights",
-                           "cmin", "cmax")
+                           "cmin", "cmax", "workers")
 
 # remove the colors kwargs
 a = list(hist2d.args);  a.remove("colors")
 hist2d.args = tuple(a)
 @hist2d.caller
 def hist2d(*args, **kwargs):
-    return get_axes_kw(kwargs).hist2d(*args, **kwargs)
+    workers = kwargs.pop("workers", None)
+    axes = get_axes_kw(kwargs)
+    if workers is None:
+        return axes.hist2d(*args, **kwargs)
+    # same as Axes.hist2d with the histogram computed by workers threads
+    from .histogram import _histogram2d_counts
+    x, y = args
+    cmin, cmax = kwargs.pop("cmin", None), kwargs.pop("cmax", None)
+    h, xedges, yedges = _histogram2d_counts(x, y,
+                                            kwargs.pop("bins", 10),
+                                            kwargs.pop("range", None),
+                                            kwargs.pop("normed", False),
+                                            kwargs.pop("weights", None),
+                                            workers)
+    if cmin is not None:
+        h[h < cmin] = None
+    if cmax is not None:
+        h[h > cmax] = None
+    pc = axes.pcolormesh(xedges, yedges, h.T, **kwargs)
+    axes.set_xlim(xedges[0], xedges[-1])
+    axes.set_ylim(yedges[0], yedges[-1])
+    return h, xedges, yedges, pc
 setpfdoc(hist2d, plt.Axes.hist2d.__doc__, "hist2d")
 
 
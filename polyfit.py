@@ -170,7 +170,7 @@ class PolyFit(XYPlot):
 
         x = alias(
                   lambda p: np.linspace(p["xmin"],p["xmax"],p["npoints"]),
-                  "-> linspace(xmin, xmax, npoints)"
+                  "-> linspace(xmin, xmax, npoints)", memo=True
                   )
         plot["x"] = x
 
@@ -179,7 +179,7 @@ class PolyFit(XYPlot):
                    "-> y_fit(x)")
         else:    
             y = alias(lambda p: get_model(p["x"], p['coeff']),
-                      "-> y_fit(x)")
+                      "-> y_fit(x)", memo=True)
         
         plot["y"] = y
         plot["ymin"] = 0
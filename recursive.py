@@ -2,6 +2,9 @@ from __future__ import division, absolute_import, print_function
 
 import weakref
 import inspect
+import re
+import threading
+from collections import Mapping
 
 from glob import fnmatch, has_magic
 
@@ -9,15 +12,11 @@ from glob import fnmatch, has_magic
 
 It is slower than the previous version recursive0 but it avoid
 cycle references.
-However as it is it will create a lot of types, because for every
-RecObject of a RecObject() instance a type is created on the fly and
-recorded in __recobjects__. For every __get__, a.b, b is a new instance
-of the stored  __recobjects__ class. That way it is also slower
-
-Does creating many types (class) can cause problems ? They are subclassed
-so should not take that much memories.
-  Another solution would be not to store a new type, but an instance maker
-which save a class and return un instance.
+For every RecObject of a RecObject() instance an instance maker is
+recorded in __recobjects__ (see _RecObjectMaker). For every __get__, a.b,
+b is a new instance made by the stored maker. The maker save what used to
+be a type created on the fly (namespace, shared parameters, history) and
+make instances of a class created only ones per RecObject class.
 
 This method has also one drawback :  a.b is a.b -> False because b is always new
 I am not sure in witch situation it can cause problems.
@@ -27,11 +26,19 @@ I am not sure in witch situation it can cause problems.
 
 __all__ = ["RecObject", "RecFunc", "cycle", "lcycle", "loop", "fcycle",
            "popargs", "parseargs", "merge_args", "extract_args",
-           "recobject", "alias"
+           "recobject", "alias", "alias_stats", "compile_go", "GoPlan"
           ]
 
 ALLOW_FAST_KEYS = True
 
+""" maximum number of parsed string paths kept in memory """
+PATH_CACHE_SIZE = 1024
+
+""" if True, parameters resolved through the hierarchy are cached per object
+and invalidated when one of the parameter dictionaries of the chain changes.
+Set it to False to always walk the hierarchy (e.g. for debuging). """
+RESOLUTION_CACHE = True
+
 """ key name which will substitued to kwargs in the default finit of RecObject """
 KWS = "params"
 
@@ -64,6 +71,343 @@ def lst_match(k, paterns):
     return False        
 
 
+######
+# Parameter dictionaries are versioned, every modification bump the version
+# of the dictionary and the global epoch. The resolution cache of an object
+# is checked against the global epoch first (O(1)), then against the
+# versions of the dictionaries in its inheritance chain.
+_params_epoch = 0
+
+class _Params(dict):
+    """ dictionary of parameters with a version counter
+
+    The version is incremented at each modification so the cached resolution
+    of parameters (see _ResolutionCache) can be invalidated.
+    cycles is the set of keys holding a cycle, lcycle, fcycle or loop (None
+    if there is none), see RecObject.reset.
+    memos are the values of the memo aliases read on the objects of these
+    parameters (see alias), they are freed with them.
+    """
+    __slots__ = ("version", "cycles", "memos")
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.version = 0
+        self.cycles = None
+        self.memos = None
+        if self:
+            self._index_all()
+
+    def _touch(self):
+        global _params_epoch
+        self.version += 1
+        _params_epoch += 1
+
+    def _index(self, item, value):
+        if isinstance(value, _loopbase_):
+            if self.cycles is None:
+                self.cycles = set()
+            self.cycles.add(item)
+        elif self.cycles:
+            self.cycles.discard(item)
+
+    def _unindex(self, item):
+        if self.cycles:
+            self.cycles.discard(item)
+
+    def _index_all(self):
+        self.cycles = set(k for k,v in self.iteritems() if isinstance(v, _loopbase_)) or None
+
+    def __setitem__(self, item, value):
+        dict.__setitem__(self, item, value)
+        self._index(item, value)
+        self._touch()
+
+    def __delitem__(self, item):
+        dict.__delitem__(self, item)
+        self._unindex(item)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        if args:
+            kwargs = dict(*args, **kwargs)
+        dict.update(self, kwargs)
+        # only the keys updated are indexed again
+        for item, value in kwargs.iteritems():
+            self._index(item, value)
+        self._touch()
+
+    def clear(self):
+        dict.clear(self)
+        self.cycles = None
+        self._touch()
+
+    def pop(self, item, *args):
+        value = dict.pop(self, item, *args)
+        self._unindex(item)
+        self._touch()
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self._unindex(item[0])
+        self._touch()
+        return item
+
+    def setdefault(self, item, value=None):
+        if item in self:
+            return dict.__getitem__(self, item)
+        self[item] = value
+        return value
+
+    def copy(self):
+        return self.__class__(self)
+
+
+class _ResolutionCache(object):
+    """ flattened view of the parameters resolved through the hierarchy
+
+    values is a dictionary of item -> (value, spath) or (_NOTFOUND, error args)
+    it is cleared as soon as one of the parameter dictionaries of the
+    chain has changed.
+    """
+    __slots__ = ("chain", "stamp", "epoch", "values")
+
+    def __init__(self, params, history):
+        chain = [params]
+        history._collect_params(chain, set())
+        seen = set()
+        self.chain = []
+        for d in chain:
+            if not isinstance(d, _Params):
+                # an unversioned dictionary, cannot cache
+                self.chain = None
+                break
+            if id(d) not in seen:
+                seen.add(id(d))
+                self.chain.append(d)
+        self.stamp = self._stamp()
+        self.epoch = _params_epoch
+        self.values = {}
+
+    def _stamp(self):
+        if self.chain is None:
+            return None
+        return tuple([d.version for d in self.chain])
+
+    def validate(self):
+        """ clear the values if the chain has changed since last call """
+        if self.epoch != _params_epoch:
+            stamp = self._stamp()
+            if stamp != self.stamp:
+                self.values.clear()
+                self.stamp = stamp
+            self.epoch = _params_epoch
+        return self.values
+
+_NOTFOUND = object()
+_FIRSTSEARCH = object()
+
+# shared empty parameters of a missing parent or instance in _History_
+# it is never modified
+_NOPARAMS = _Params()
+
+def _cached_search(obj, key, walk, *args):
+    """ return walk(*args) from the resolution cache of obj if possible """
+    rc = obj._rcache
+    if rc is None:
+        # many instances are short lived (e.g. obj.child), the cache
+        # is built only from the second search
+        obj._rcache = _FIRSTSEARCH
+        return walk(*args)
+    if rc is _FIRSTSEARCH:
+        rc = obj._rcache = _ResolutionCache(obj._params, obj._history)
+    if rc.chain is None:
+        return walk(*args)
+
+    values = rc.validate()
+    found = values.get(key, None)
+    if found is None:
+        found = values[key] = _walk_found(walk, *args)
+    if found[0] is _NOTFOUND:
+        raise KeyError(*found[1])
+    return found
+
+def _walk_found(walk, *args):
+    """ return walk(*args) or (_NOTFOUND, error args) if not found """
+    try:
+        return walk(*args)
+    except KeyError as e:
+        return (_NOTFOUND, e.args)
+
+def _resolution_values(obj):
+    """ return the validated resolution cache values of obj
+
+    Return None if the parameters cannot be cached or if this is the first
+    search of obj (see _cached_search)
+    """
+    if not RESOLUTION_CACHE:
+        return None
+    rc = obj._rcache
+    if rc is None:
+        obj._rcache = _FIRSTSEARCH
+        return None
+    if rc is _FIRSTSEARCH:
+        rc = obj._rcache = _ResolutionCache(obj._params, obj._history)
+    if rc.chain is None:
+        return None
+    return rc.validate()
+
+def _run_program(program, item):
+    """ search item with a program made by _History_._program
+
+    return (value, spath) or (_NOTFOUND, error args) as _walk_found
+    """
+    pc = 0
+    n = len(program)
+    notinerited = False
+    while pc < n:
+        params, arg = program[pc]
+        if params is None:
+            inerit, jump = arg
+            if (item != "__inerit__") and (item not in inerit):
+                pc = jump
+                notinerited = pc == n
+                continue
+        else:
+            value = params.get(item, _NOTFOUND)
+            if value is not _NOTFOUND:
+                return value, arg
+        pc += 1
+    if notinerited:
+        return (_NOTFOUND, ("'%s' (not inerited)"%item,))
+    return (_NOTFOUND, ("'%s'"%item,))
+
+def _is_simple_item(item):
+    """ True if item is a parameter name and not a path """
+    return isinstance(item, basestring) and item and \
+           ("." not in item) and ("|" not in item)
+
+# per instance attributes of the instances made by a maker
+_INSTANCE_SLOTS = ("_maker", "_params", "_history", "ids", "_rcache")
+
+def _class_dict(obj):
+    """ the obj.__dict__ used to build a derived instance maker
+
+    without the per instance state, which goes in the instance slots
+    """
+    d = obj.__dict__.copy()
+    for k in _INSTANCE_SLOTS:
+        d.pop(k, None)
+    return d
+
+class _LRUCache(object):
+    """ a bounded dictionary, the least recently used keys are dropped first
+
+    When full, the oldest quarter of the entries is dropped in one go so
+    the bookkeeping of a hit is only a tick update.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = {}
+        self.tick = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        entry = self.data.get(key, None)
+        if entry is None:
+            return default
+        self.tick += 1
+        entry[1] = self.tick
+        return entry[0]
+
+    def set(self, key, value):
+        # the factories of a go list can be computed in threads (see GoPlan)
+        with self.lock:
+            data = self.data
+            if len(data) >= self.maxsize:
+                entries = sorted(data.iteritems(), key=lambda kv: kv[1][1])
+                for k, _ in entries[:max(1, len(entries)//4)]:
+                    data.pop(k, None)
+            self.tick += 1
+            data[key] = [value, self.tick]
+
+    def clear(self):
+        self.data.clear()
+
+# parsed 'a.b.c' attribute paths and 'a.b.c|item' item paths
+_objpath_cache = _LRUCache(PATH_CACHE_SIZE)
+_itempath_cache = _LRUCache(PATH_CACHE_SIZE)
+
+def _compile_matcher(glob):
+    """ return a matcher function for a glob or a '(glob1, glob2)' list pattern """
+    if has_magic_lst(glob):
+        patterns = lst_pattern(glob)
+    else:
+        patterns = [glob]
+    matchers = [re.compile(fnmatch.translate(p)).match for p in patterns]
+    if len(matchers) == 1:
+        return matchers[0]
+    return lambda k: any(m(k) for m in matchers)
+
+def _compile_objpath(path):
+    """ parse a 'a.b.c' path into a tuple of (attr, matcher) tokens
+
+    matcher is None for a plain attribute, or a compiled matcher if the
+    attribute is a glob pattern. Results are cached.
+    """
+    tokens = _objpath_cache.get(path)
+    if tokens is None:
+        tokens = tuple((attr, (_compile_matcher(attr)
+                               if (has_magic(attr) or has_magic_lst(attr))
+                               else None)
+                       ) for attr in path.split(".") if attr)
+        _objpath_cache.set(path, tokens)
+    return tokens
+
+def _compile_itempath(path):
+    """ parse a 'a.b.c|item' string into (tokens, item)
+
+    tokens is None if there is no path to walk, see _compile_objpath.
+    Results are cached.
+    """
+    parsed = _itempath_cache.get(path)
+    if parsed is None:
+        if not "|" in path:
+            if path and (("." in path) or has_magic_lst(path) or has_magic(path)):
+                parsed = (_compile_objpath(path), "")
+            else:
+                parsed = (None, path)
+        else:
+            spath = path.split("|")
+            if len(spath)>2:
+                raise TypeError("to many '|' in '%s'"%path)
+            objpath, item = [s.strip() for s in spath]
+            parsed = (_compile_objpath(objpath) if objpath else None, item)
+        _itempath_cache.set(path, parsed)
+    return parsed
+
+def _walk_objpath(obj, tokens, getattr=getattr):
+    """ walk the tokens of a parsed path from obj, see relative_getobj """
+    iscat = isinstance(obj, CatRecObject)
+    for attr, matcher in tokens:
+        if matcher is not None:
+            if iscat:
+                lst = []
+                for child in obj:
+                    lst.extend(_colect_rec_childs(child, attr, matcher))
+                obj = CatRecObject(lst)
+            else:
+                obj = _colect_rec_childs(obj, attr, matcher)
+            iscat = True
+        else:
+            if iscat:
+                obj = CatRecObject([child["."+attr] for child in obj])
+            else:
+                obj = getattr(obj, attr)
+    return obj
+
+
 def newid(obj):
     """ id returned for a RecObject or RecFunc asked at __init__"""
     return id(obj)
@@ -93,30 +437,7 @@ def relative_getobj(obj, path, getattr=getattr):
         TypeError: if the relative path is below root object
 
     """
-    
-    paths = path.split(".")
-    #if paths[0:2] == ['','']: # remove the first blank e.i. first '.'
-    #    paths = paths[2:]
-
-    iscat = isinstance(obj, CatRecObject)
-    for attr in paths:        
-        if not attr:
-            continue
-        if has_magic(attr) or has_magic_lst(attr):
-            if iscat:
-                lst = []
-                for child in obj:
-                    lst.extend(_colect_rec_childs(child, attr))
-                obj = CatRecObject(lst)    
-            else:    
-                obj = _colect_rec_childs(obj, attr)
-            iscat = True
-        else:
-            if iscat:
-                obj = CatRecObject([child["."+attr] for child in obj])
-            else:                
-                obj = getattr(obj, attr)
-    return obj
+    return _walk_objpath(obj, _compile_objpath(path), getattr)
 
 def getitempath(obj, path, getattr=getattr):
     """ from obj and a path return a target obj and an item
@@ -418,89 +739,262 @@ def extract_args(finit, remove=0):
 
 
 
-def _go_walker(obj, func, output, sp):
-    """ see doc of go attribute of RecObject """
+# compiled go steps, see compile_go
+_GO_SEQ, _GO_COLON, _GO_PATH, _GO_ITEM, _GO_CALL, _GO_ERROR = range(6)
+
+# compiled go command strings
+_gostep_cache = _LRUCache(PATH_CACHE_SIZE)
+
+def _parse_go_string(func):
+    """ compile a go command string into a step, see _run_go_step """
     ##
     # understood syntax:
     # "subplot.attr1|-all"  work is plot.subplot.attr1["-all"] is a list of go string command
     # "subplot: attr1,attr2,attr3" -> "subplot.attr1", "subplot.attr2", "subplot.attr3"
     # "subplot: attr1|-all" -> subplot.attr1.go("-all")
     #
+    func = func.strip()
+    if ";" in func:
+        return (_GO_SEQ, [_compile_go_string(f) for f in func.split(";")])
 
-    if isinstance(func, basestring):
-        func = func.strip()
-        if ";" in func:
-            return _go(obj, func.split(";"), output, sp)
+    if func[0]=="-":
+        # no embiguity we want a keyword here
+        func = "|"+func
 
-        if func[0]=="-":
-            # no embiguity we want a keyword here
-            func = "|"+func
+    if ":" in func:
+        if func.count(":")>1:
+            raise TypeError("to many ':' in '%s' expecting one"%func)
 
-        if ":" in func:
-            if func.count(":")>1:
-                raise TypeError("to many ':' in '%s' expecting one"%func)
+        rootpath, paths = [s.strip() for s in func.split(":")]
+        paths = [s.strip() for s in paths.split(",")]
+        return (_GO_COLON, _compile_objpath(rootpath), "."+rootpath,
+                [_compile_go_string(p) for p in paths])
 
-            rootpath, paths = [s.strip() for s in func.split(":")]
-            paths = [s.strip() for s in paths.split(",")]
-            obj = relative_getobj(obj, rootpath, getattrandinit)
+    if not ("|" in func):
+        return (_GO_PATH, _compile_objpath(func), "."+func)
 
-            _go(obj, paths, output, sp+"."+rootpath)
-            return
+    if func.count("|")>1:
+        raise TypeError("to many '|' in '%s' expecting one"%func)
 
+    path, item = [s.strip() for s in func.split("|",1)]
+    return (_GO_ITEM, _compile_objpath(path) if len(path) else None,
+            "."+path if path else "", item, "."+func)
 
+def _compile_go_string(func):
+    """ return the compiled step of a go command string, from the cache if possible
 
+    A wrong command is compiled as an error raised when the step is executed
+    """
+    step = _gostep_cache.get(func, None)
+    if step is None:
+        try:
+            step = _parse_go_string(func)
+        except Exception as e:
+            step = (_GO_ERROR, e)
+        _gostep_cache.set(func, step)
+    return step
+
+def _compile_go_step(func):
+    """ compile any element of a go list: string, list, GoPlan or callable """
+    if isinstance(func, basestring):
+        return _compile_go_string(func)
+    if isinstance(func, GoPlan):
+        return (_GO_SEQ, func.steps)
+    if isinstance(func, (tuple,list)):
+        return (_GO_SEQ, [_compile_go_step(f) for f in func])
+    return (_GO_CALL, func)
+
+def _run_go_step(obj, step, output, sp):
+    """ execute a compiled go step on obj and record the results in output """
+    kind = step[0]
+    if kind == _GO_SEQ:
+        for substep in step[1]:
+            _run_go_step(obj, substep, output, sp)
+
+    elif kind in (_GO_COLON, _GO_PATH, _GO_ITEM):
+        tokens = step[1]
+        if tokens is not None:
+            obj = _walk_objpath(obj, tokens, getattrandinit)
+        _run_go_target(obj, step, output, sp)
+
+    elif kind == _GO_CALL:
+        func = step[1]
+        if sp:
+            output[sp] = func()
         else:
-            if not ("|" in func):
-
-                obj = relative_getobj(obj, func, getattrandinit)
-                if not isinstance(obj, RecObject):
-                    obj = obj() # RecObject not already initialized
-                                # but not other object
-                    output[sp+"."+func] = obj
-                    return
-                else:
-                    ###
-                    # if the end point is a plot RecObject,
-                    # execute its "-" e.i. obj.go()
-                    if "-" in obj:
-                        return _go_walker(obj, "-", output, sp+"."+func)
-                    else:
-                        return
-
-            else:
-                if func.count("|")>1:
-                    raise TypeError("to many '|' in '%s' expecting one"%func)
-
-                path, item = [s.strip() for s in func.split("|",1)]
-                if len(path):
-                    obj = relative_getobj(obj, path, getattrandinit)
+            output[None] = output.get(None,[])+[func()]
 
-                if len(item):
-                    return _go(obj, obj[item], output, sp+("."+path if path else ""))
+    else:
+        raise step[1]
 
-                else:
-                    if isinstance(obj, RecObject):
-                        if "-" in obj:
-                            return _go_walker(obj, "-", output, sp+"."+func)
-                        else:
-                            return
-                    else:
-                        output[sp+"."+func] = obj()
-                        return
+def _run_go_target(obj, step, output, sp):
+    """ execute a path step on obj, the end of its path (already walked and
+    initialized, see _run_go_step)
+    """
+    kind = step[0]
+    if kind == _GO_COLON:
+        _, _, key, substeps = step
+        sp = sp+key
+        for substep in substeps:
+            _run_go_step(obj, substep, output, sp)
+
+    elif kind == _GO_PATH:
+        key = step[2]
+        if not isinstance(obj, RecObject):
+            obj = obj() # RecObject not already initialized
+                        # but not other object
+            output[sp+key] = obj
+        elif "-" in obj:
+            ###
+            # if the end point is a plot RecObject,
+            # execute its "-" e.i. obj.go()
+            _run_go_step(obj, _compile_go_string("-"), output, sp+key)
 
-    elif isinstance(func, (tuple,list)):
-        return _go(obj, func, output, sp)
     else:
-        if sp:
-            output[sp] = func()
+        _, _, pathkey, item, key = step
+        if len(item):
+            _go(obj, obj[item], output, sp+pathkey)
+        elif isinstance(obj, RecObject):
+            if "-" in obj:
+                _run_go_step(obj, _compile_go_string("-"), output, sp+key)
         else:
-            output[None] = output.get(None,[])+[func()]
-        return
+            output[sp+key] = obj()
+
+def _go_walker(obj, func, output, sp):
+    """ see doc of go attribute of RecObject """
+    _run_go_step(obj, _compile_go_step(func), output, sp)
 
 def _go(obj, funclist, output, sp=""):
     """ see doc of go attribute of RecObject """
     for func in funclist:
-        _go_walker(obj, func, output, sp)
+        _run_go_step(obj, _compile_go_step(func), output, sp)
+
+
+def _submit(executor, func, *args):
+    """ submit func(*args) to an executor, return a function to get the result
+
+    executor is any object with a submit (concurrent.futures) or
+    apply_async (multiprocessing.pool) method
+    """
+    if hasattr(executor, "submit"):
+        return executor.submit(func, *args).result
+    return executor.apply_async(func, args).get
+
+_go_local = threading.local()
+
+def _defer_go(obj):
+    """ True if called from a go compute thread, obj.goifgo() is then
+    called later by the thread executing the go plan, see GoPlan
+    """
+    deferred = getattr(_go_local, "deferred", None)
+    if deferred is None:
+        return False
+    deferred.append(obj)
+    return True
+
+def _go_compute(factory):
+    """ initialize factory in a compute thread, return the new instance and
+    the objects which have deferred their goifgo
+    """
+    _go_local.deferred = deferred = []
+    try:
+        return factory(), deferred
+    finally:
+        _go_local.deferred = None
+
+def _flat_go_steps(steps):
+    for step in steps:
+        if step[0] == _GO_SEQ:
+            for substep in _flat_go_steps(step[1]):
+                yield substep
+        else:
+            yield step
+
+def _go_factory(obj, step):
+    """ the not initialized RecObject at the end of a one attribute path
+    step (e.g. "histogram", "polyfit:plot" or "polyfit|-all"), else None
+    """
+    if step[0] not in (_GO_COLON, _GO_PATH, _GO_ITEM) or isinstance(obj, CatRecObject):
+        return None
+    tokens = step[1]
+    if tokens is None or len(tokens) != 1 or tokens[0][1] is not None:
+        return None
+    target = getattr(obj, tokens[0][0])
+    if isinstance(target, RecObject) and not target.isinitialized:
+        return target
+    return None
+
+class GoPlan(object):
+    """ a compiled list of go commands, made by compile_go
+
+    plan(obj) is obj.go(*funclist) and return the same output dictionary.
+    The plan does not depend on obj and can be executed on any object.
+
+    plan(obj, executor) computes the factories of obj called by the plan
+    (e.g. "histogram", "polyfit:plot") in the threads of executor: a
+    number of threads, a concurrent.futures.ThreadPoolExecutor or a
+    multiprocessing.pool.ThreadPool. A factory is submitted once the
+    steps before it that are not factories have run, so consecutive
+    factories are computed together. Only their init functions run in
+    the threads; their goifgo, the rest of their step (e.g. ":plot") and
+    all the other steps are executed in order in the calling thread, as
+    without executor. Process pools cannot be used, the plots are not
+    picklable.
+    """
+    __slots__ = ("steps",)
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def __call__(self, obj, executor=None):
+        output = {}
+        if executor is None:
+            for step in self.steps:
+                _run_go_step(obj, step, output, "")
+            return output
+
+        if isinstance(executor, int):
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(max(executor, 1))
+            try:
+                return self(obj, pool)
+            finally:
+                pool.close()
+                pool.join()
+
+        computed = []
+        for step in _flat_go_steps(self.steps):
+            factory = _go_factory(obj, step)
+            if factory is not None:
+                computed.append((step, _submit(executor, _go_compute, factory)))
+                continue
+            _go_draw(computed, output)
+            _run_go_step(obj, step, output, "")
+        _go_draw(computed, output)
+        return output
+
+def _go_draw(computed, output):
+    """ execute in order the steps of the computed factories, see GoPlan """
+    for step, result in computed:
+        new, deferred = result()
+        for d in deferred:
+            d.goifgo()
+        _run_go_target(new, step, output, "")
+    del computed[:]
+
+def compile_go(*funclist):
+    """ compile go commands into a GoPlan executable on any object
+
+    funclist is the same than for the go method of RecObject. The command
+    strings are parsed ones and kept in cache, the lists are compiled with
+    their content at the time of the call.
+
+    Example:
+        plan = compile_go("axes; polyfit:plot,scatter", "show")
+        plan(obj) # same as obj.go("axes; polyfit:plot,scatter", "show")
+
+    """
+    return GoPlan([_compile_go_step(func) for func in funclist])
 
 
 def _is_iterable(obj):
@@ -573,19 +1067,29 @@ def parseargs(obj, args, *arg_names, **kwargs):
 
 
     largs = len(args)
-    for i,p in enumerate(arg_names):
-        if i<largs:
-            obj[p] = args[i]
-            yield args[i]
-            continue
+    for i,p in enumerate(arg_names[:largs]):
+        obj[p] = args[i]
+        yield args[i]
 
+    # RecObject and RecFunc resolve all the remaining names in one pass
+    resolve = getattr(obj, "_resolve", None)
+    if resolve is not None:
+        values = iter(resolve([p for p in arg_names[largs:] if p is not None]))
+
+    for i,p in enumerate(arg_names[largs:], start=largs):
         if p is None:
             raise TypeError("missing %dth argument"%(i+1))
-        try:
-            yield obj[p]
-            continue
-        except KeyError:
-            pass
+        if resolve is not None:
+            value = next(values)
+            if value is not _NOTFOUND:
+                yield value
+                continue
+        else:
+            try:
+                yield obj[p]
+                continue
+            except KeyError:
+                pass
 
         try:
             yield kwargs[p]
@@ -777,8 +1281,62 @@ def recfunc(*args, **kwargs):
 
 
 
+class _ParamsView(Mapping):
+    """ read only view of a list of parameter dictionaries
+
+    The value of a key is taken from the first dictionary having it. Nothing
+    is copied, the view follows the changes of the dictionaries.
+    copy() return a new dictionary.
+    """
+    __slots__ = ("chain",)
+
+    def __init__(self, chain):
+        self.chain = chain
+
+    def __getitem__(self, key):
+        for d in self.chain:
+            if key in d:
+                return d[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        for d in self.chain:
+            if key in d:
+                return True
+        return False
+
+    def __iter__(self):
+        seen = set()
+        for d in self.chain:
+            for k in d:
+                if k not in seen:
+                    seen.add(k)
+                    yield k
+
+    def __len__(self):
+        return len(set().union(*self.chain))
+
+    def iteritems(self):
+        seen = set()
+        for d in self.chain:
+            for k, v in d.iteritems():
+                if k not in seen:
+                    seen.add(k)
+                    yield k, v
+
+    def copy(self):
+        params = {}
+        for d in reversed(self.chain):
+            params.update(d)
+        return params
+
+    def __repr__(self):
+        return "<params view %r>"%self.copy()
+
 class _History_(object):
     """ a class to record parameter history path """
+    __slots__ = ("i_params", "i", "p_params", "p")
+
     def __init__(self, i, p):
         """ i are instances p are parents """
         self.i_params, self.i = i
@@ -798,19 +1356,100 @@ class _History_(object):
         return new
 
 
-    def all(self):
-        params = self.i_params.copy()
+    def _collect_params(self, lst, seen):
+        """ append all the parameter dictionaries of the history in lst """
+        if id(self) in seen:
+            return
+        seen.add(id(self))
+        lst.append(self.i_params)
         if self.i:
-            for k,v in self.i.all().iteritems():
-                params.setdefault(k,v)
+            self.i._collect_params(lst, seen)
+        lst.append(self.p_params)
+        if self.p:
+            self.p._collect_params(lst, seen)
 
-        for k,v in self.p_params.iteritems():
-            params.setdefault(k,v)
+    def _inerit(self):
+        try:
+            inerit, _ = self._searchi("__inerit__")
+        except KeyError:
+            return None
+        return inerit
+
+    def _program(self, ip=True):
+        """ flatten the _searchip (or _searchi if ip is False) walk
+
+        Return a list of (params, spath) to look at in order, or of
+        (None, (inerit, jump)) when the walk would raise a KeyError for items
+        not in inerit, then it continues at the index jump.
+        see _run_program
+        """
+        ops = []
+        if ip:
+            self._emit_searchip(ops, None, "")
+        else:
+            self._emit_searchi(ops, None, "")
+        n = len(ops)
+        return [(d, a) if d is not None else (d, (a[0], n if a[1] is None else a[1][0]))
+                for d, a in ops]
+
+    ##
+    # the _emit_* methods mirror the _search* methods. A KeyError raised
+    # inside a call catched by the caller jumps after that call (the fail
+    # cell, patched when known), the end of a method simply continues to
+    # what follows in the list, which is where the caller goes.
+    def _emit_sub(self, ops, emit, tail):
+        after = [None]
+        emit(ops, after, tail)
+        after[0] = len(ops)
+
+    def _emit_params(self, ops, params, spath):
+        if params:
+            ops.append((params, spath))
+
+    def _emit_guard(self, ops, fail):
+        inerit = self._inerit()
+        if inerit is not None:
+            ops.append((None, (inerit, fail)))
+
+    def _emit_searchi(self, ops, fail, tail):
+        self._emit_params(ops, self.i_params, PSI+tail)
+        if self.i:
+            self._emit_sub(ops, self.i._emit_searchi, PSI+tail)
 
+    def _emit_search(self, ops, fail, tail):
+        self._emit_params(ops, self.i_params, PSI+tail)
+        if self.i:
+            self._emit_sub(ops, self.i._emit_search, PSI+tail)
+        self._emit_guard(ops, fail)
+        self._emit_params(ops, self.p_params, PSP+tail)
         if self.p:
-            for k,v in self.p.all().iteritems():
-                params.setdefault(k,v)
-        return params
+            self._emit_sub(ops, self.p._emit_search, PSP+tail)
+
+    def _emit_searchip(self, ops, fail, tail):
+        self._emit_sub(ops, self._emit_searchi, tail)
+        self._emit_guard(ops, fail)
+        self._emit_params(ops, self.p_params, PSP+tail)
+        if self.p:
+            self._emit_sub(ops, self.p._emit_searchip, PSP+tail)
+        self._emit_search(ops, fail, tail)
+
+    def chain(self, lst=None):
+        """ return the list of parameter dictionaries in the order of all()
+
+        The dictionaries are appended to lst if given.
+        """
+        lst = [] if lst is None else lst
+        seen = set(id(d) for d in lst)
+        collected = []
+        self._collect_params(collected, set())
+        for d in collected:
+            if id(d) not in seen:
+                seen.add(id(d))
+                lst.append(d)
+        return lst
+
+    def all(self):
+        return _ParamsView(self.chain()).copy()
 
     def mapall(self, f=lambda p,k,v: p.setdefault(k,v), p=None):
         p = p or {}
@@ -979,18 +1618,21 @@ class _History_(object):
 
 
 class _RecObject_Instanced(object):
+    # the per instance state lives in slots, the instance __dict__ only
+    # holds what comes from the maker namespace
+    __slots__ = _INSTANCE_SLOTS
     _derived_cl = True
     def __init__(self, ids, i, p, new=False):
         if new:
-            self._params  = {}
+            self._params  = _Params()
         ih, ph= None, None
         if i:
             ih = i._history
         if p:
             ph = p._history
 
-        ip = i._params if i else {}
-        pp = p._params if p else {}
+        ip = i._params if i else _NOPARAMS
+        pp = p._params if p else _NOPARAMS
 
         if i and i._default_params:
             # default paramters can inerit from an parentinstance
@@ -1008,24 +1650,62 @@ class _RecObject_Instanced(object):
         if self.finit and self.finit.__doc__:
             self.__doc__ = self.finit.__doc__
 
-    @classmethod
-    def _derive_derived_cl(cl, p):
-        newcl = type(cl.__name__, (cl,), {})
-        ph = p._history
-        pp = p._params
-
-        h = newcl._history 
 
+def _instanced_class(cl, mixin):
+    """ return the class of the derived instances of cl
 
-        newcl._history = _History_( (h.i_params, h.i), 
-                                      (pp, ph)
-                                     )    
-        __recobjects__ = {}
-        for k, sub in cl.__recobjects__.iteritems():
-            __recobjects__[k] = sub._derive_derived_cl(newcl)
-        newcl._params = cl._params.copy()    
-        newcl.__recobjects__ = __recobjects__
-        return newcl    
+    The class is created only ones per class and stored in cl.
+    """
+    newcl = cl.__dict__.get("_instanced_class", None)
+    if newcl is None:
+        newcl = type(cl.__name__, (mixin, cl), {})
+        cl._instanced_class = newcl
+    return newcl
+
+
+class _RecObjectMaker(object):
+    """ make instances of a derived RecObject
+
+    A maker replace a class created on the fly. It holds what was the
+    class namespace: the attributes copied from the original object,
+    the parameters shared by the instances made from it, the history
+    and the makers of the childs.
+    The instances are made from a class created ones per RecObject class
+    (see _instanced_class).
+    """
+    __slots__ = ("cl", "namespace", "_params", "_history", "__recobjects__")
+
+    def __init__(self, cl, namespace, params, history, recobjects=None):
+        self.cl = cl
+        self.namespace = namespace
+        self._params = params
+        self._history = history
+        self.__recobjects__ = recobjects
+
+    def __call__(self, ids, i, p, new=False):
+        cl = self.cl
+        obj = cl.__new__(cl)
+        obj.__dict__.update(self.namespace)
+        obj._maker = self
+        obj._params = self._params
+        obj._rcache = None
+        if self.__recobjects__ is not None:
+            obj.__recobjects__ = self.__recobjects__
+        obj.__init__(ids, i, p, new)
+        return obj
+
+    def _rebased(self, p):
+        h = self._history
+        return self.__class__(self.cl, self.namespace, self._params,
+                              _History_((h.i_params, h.i), (p._params, p._history))
+                              )
+
+    def rebase(self, p):
+        """ return a new maker where the parent parameters are taken from p """
+        new = self._rebased(p)
+        new.__recobjects__ = {k:sub.rebase(new) for k, sub in self.__recobjects__.iteritems()}
+        new._params = self._params.copy()
+        return new
 
 class RecObject(object):
     """ RecObject object is a clolection of RecObject or RecFunc callable and
@@ -1295,16 +1975,20 @@ class RecObject(object):
     """
     _stopped = False
 
+    _rcache = None
+    """ the _ResolutionCache of the instance, built at first search """
+
+    rootids = ()
+
     def __init__(self, _init_=None, **params):
 
         if _init_ is not None:
             self.set_initier(_init_)
 
         self.ids = newid(self)
-        self.rootids = []
 
 
-        self._params  = {}
+        self._params  = _Params()
         self._params.update(self._default_params)
 
         self.locals.update(params.get(KWS,{}), **params)
@@ -1312,7 +1996,7 @@ class RecObject(object):
 
         self.__recobjects__ = {}
 
-        self._history = _History_( ({},None), ({},None) )
+        self._history = _History_( (_NOPARAMS,None), (_NOPARAMS,None) )
 
 
     @staticmethod
@@ -1356,23 +2040,22 @@ class RecObject(object):
         modifing the all dictionary will have no effect on the recobj or its
         parents.
 
+        """
+        return self._all_view().copy()
+
+    def _all_view(self):
+        """ read only view of all the parameters in the hierarchy
+
+        The view follows the changes of the recobj and its parents, nothing
+        is copied (see _ParamsView).
         """
         inerit = self.locals.get("__inerit__", None)
         if inerit is None:
-            params = self._history.all()
-            
-        else:
-            params = {}
-            for p in inerit:
-                try:
-                    value, _ =  self._search(p)
-                except KeyError:
-                    pass
-                else:
-                    params[p] = value                
+            return _ParamsView(self._history.chain([self.locals]))
 
-        params.update(self.locals)
-        return params
+        params = {p:value for p, value in zip(inerit, self._resolve(inerit, _NOTFOUND, True))
+                  if value is not _NOTFOUND}
+        return _ParamsView([self.locals, params])
 
 
     def __call__(self, *args, **kwargs):
@@ -1411,8 +2094,32 @@ class RecObject(object):
         (that not the case for e.g. generators).
 
         """
-        for k,v in self.all.iteritems():
-            if _is_iterable(v):
+        ##
+        # only the keys indexed as cycles in the hierarchy are looked at
+        locals = self.locals
+        chain = self._history.chain([locals])
+        keys = set()
+        for d in chain:
+            if isinstance(d, _Params):
+                if d.cycles:
+                    keys.update(d.cycles)
+            else:
+                keys.update(k for k,v in d.iteritems() if isinstance(v, _loopbase_))
+        if not keys:
+            return
+
+        inerit = locals.get("__inerit__", None)
+        if inerit is None:
+            view = _ParamsView(chain)
+            keys = list(keys)
+            values = [view[k] for k in keys]
+        else:
+            keys = [k for k in keys if (k in locals) or (k in inerit)]
+            values = self._resolve(keys, _NOTFOUND, True)
+
+        for k,v in zip(keys, values):
+            # the cycle can be hidden by an other value
+            if isinstance(v, _loopbase_):
                 self[k] = iter(v)
 
 
@@ -1669,7 +2376,7 @@ class RecObject(object):
 
 
         """
-        params = dict(self.all, **params)
+        params = dict(self._all_view().copy(), **params)
         new = self.__class__(
                              **params
                             )
@@ -1720,12 +2427,10 @@ class RecObject(object):
     def _derive(self, parent):
 
         if self._derived_cl:            
-            new = self.__class__(None, self, parent, True)
+            new = self._maker(None, self, parent, True)
             __recobjects__ = {}
             for k, sub in new.__recobjects__.iteritems():
-                newsub_cl = sub._derive_derived_cl(new)
-                #newsub_cl = sub(None, sub, new, True)._derive_cl()
-                __recobjects__[k] = newsub_cl
+                __recobjects__[k] = sub.rebase(new)
             new.__recobjects__ = __recobjects__        
 
         else:            
@@ -1743,37 +2448,21 @@ class RecObject(object):
 
 
     def _derive_cl(self):
-        cl = self.__class__
-
+        """ return a maker of derived instances of self """
         if self._derived_cl:
-            newcl = type(cl.__name__, (cl,), self.__dict__)
+            cl = self.__class__
         else:
-            newcl = type(cl.__name__, (_RecObject_Instanced, cl), self.__dict__)
+            cl = _instanced_class(self.__class__, _RecObject_Instanced)
 
+        namespace = _class_dict(self)
+        namespace["finit"] = self.finit
+        maker = _RecObjectMaker(cl, namespace, self._params, self._history)
         ####
         # We need to make all the recorded __recobjects__ new
-        # using the _copy_cl method (copy the class)
-        __recobjects__ = {}
-        for k, sub in self.__recobjects__.iteritems():
-                #__recobjects__[k] = sub._copy_cl()
-                __recobjects__[k] = sub._derive_derived_cl(newcl)
-                #__recobjects__[k] =  sub(None, sub, newcl, True)._derive_cl()
-        newcl._params = self._default_params.copy()
-
-        newcl.__recobjects__ = __recobjects__
-
-        newcl.finit = staticmethod(self.finit)
-        return newcl
-    @classmethod
-    def _copy_cl(cl):
-        newcl = type(cl.__name__, (cl,), {})
-
-        __recobjects__ = {}
-        for k, sub in cl.__recobjects__.iteritems():
-            __recobjects__[k] = sub._copy_cl()
-        newcl.__recobjects__ = __recobjects__
-        return newcl
-    
+        # rebased on the new maker
+        maker.__recobjects__ = {k:sub.rebase(maker) for k, sub in self.__recobjects__.iteritems()}
+        maker._params = _Params(self._default_params)
+        return maker
 
 
     def _new_instance(self, parent):
@@ -1911,18 +2600,11 @@ class RecObject(object):
     if ALLOW_FAST_KEYS:
         def __getitempath__(self, path, getattr=getattr):
             if isinstance(path, basestring):
-                if not "|" in path:
-                    if ("." in path) or (has_magic_lst(path)) or (has_magic(path)):
-                        #path = path.lstrip(".")
-                        return getitempath(self, (path,), getattr=getattr)
-                    return getitempath(self, path, getattr=getattr)
-
-                spath = path.split("|")
-                if len(spath)>2:
-                    raise TypeError("to many '|' in '%s'"%path)
-                path, item = [s.strip() for s in spath]
-                #path = path.lstrip(".")
-                return getitempath(self, (path,item), getattr=getattr)
+                # the parsing of the string path is cached
+                tokens, item = _compile_itempath(path)
+                if tokens:
+                    return _walk_objpath(self, tokens, getattr), item
+                return self, item
 
             return getitempath(self, path, getattr=getattr)
     else:
@@ -1962,9 +2644,17 @@ class RecObject(object):
     def _search(self, item, spath=""):
         """ search the item in locals, than in the history, parentinstance first
         than parent.
+
+        The result is taken from the resolution cache if RESOLUTION_CACHE is True
         Raises:
             KeyError if not found
         """
+        if RESOLUTION_CACHE and not spath:
+            return _cached_search(self, item, self._search_walk, item)
+        return self._search_walk(item, spath)
+
+    def _search_walk(self, item, spath=""):
+        """ same as _search but always walk through the hierarchy """
         try:
             value = self.locals[item]
         except KeyError:
@@ -2140,13 +2830,57 @@ class RecObject(object):
 
     def getargs(self, *params, **kwargs):
         lst = []
-        for p in params:
-            try:
-                lst.append(self[p])
-            except KeyError:
-                lst.append(kwargs[p])
+        for p, value in zip(params, self._resolve(params)):
+            if value is _NOTFOUND:
+                value = kwargs[p]
+            lst.append(value)
         return tuple(lst)
 
+    def _resolve(self, items, default=_NOTFOUND, real=False):
+        """ return the list of self[item] for all items, default if missing
+
+        if real is True the values are returned as they are (no alias)
+        The resolution cache is validated ones for all items and missing
+        items do not raise any KeyError, only the items never searched
+        before walk through the hierarchy.
+        """
+        values = _resolution_values(self)
+        locals = self.locals
+        inerit = locals.get("__inerit__", None)
+        programs = {}
+        out = []
+        for item in items:
+            if not _is_simple_item(item):
+                try:
+                    out.append(self[item])
+                except KeyError:
+                    out.append(default)
+                continue
+
+            found = None if values is None else values.get(item, None)
+            if found is None:
+                value = locals.get(item, _NOTFOUND)
+                if value is not _NOTFOUND:
+                    found = (value, "")
+                else:
+                    # same walk than _search_walk
+                    ip = (inerit is None) or (item in inerit)
+                    program = programs.get(ip, None)
+                    if program is None:
+                        program = programs[ip] = self._history._program(ip)
+                    found = _run_program(program, item)
+                if values is not None:
+                    values[item] = found
+            value = found[0]
+            if value is not _NOTFOUND and not real:
+                try:
+                    value = self._return_value(value)
+                except KeyError:
+                    # e.g. an alias to a missing item
+                    value = _NOTFOUND
+            out.append(default if value is _NOTFOUND else value)
+        return out
+
     # def getcallargs(self, *args, **kwargs):
     #     allkwargs =  self.all
     #     largs = len(args)
@@ -2203,7 +2937,7 @@ class RecObject(object):
         return value
 
     def _get_value_info(self):
-        all = self.all
+        all = self._all_view()
         output = []
         for key in all:
             if key[0:2]=="__" and key[-2:]=="__":
@@ -2326,6 +3060,11 @@ class RecObject(object):
             e.g : obj["-"] = ["plot"]
             If "-" is not define, do nothing and return {}
 
+        obj.go("histogram", "polyfit", "legend", executor=4)
+            compute the factories histogram and polyfit in 4 threads,
+            their drawing and everything else is done in order in the
+            calling thread (see GoPlan).
+
         Combinations are also ok:
             obj.go( "-all", "polyfit:-all")
             obj.go("-clear; step; -all;")
@@ -2340,6 +3079,7 @@ class RecObject(object):
 
 
         """
+        executor = kwargs.pop("executor", None)
         if len(kwargs):
             params = kwargs.pop(KWS,{})
             self = self.derive(**kwargs)
@@ -2350,25 +3090,24 @@ class RecObject(object):
             if not "-" in self:
                 return {}
             funclist = ["|-"]
-        output = {}
-        _go(self, funclist, output, "")
-        return output
+        return compile_go(*funclist)(self, executor)
 
 
-class _RecFunc_Instanced:
+class _RecFunc_Instanced(object):
     """ redefine __init__ for an Instanced RecFunc
     internal use only
     """
+    __slots__ = _INSTANCE_SLOTS
     _derived_cl = True
     def __init__(self, ids, i, p, new=False):
         if new:
-            self._params  = {}
+            self._params  = _Params()
 
         ih = getattr(i,"_history", None)
         ph = getattr(p,"_history", None)
 
-        ip = i._params if i else {}
-        pp = p._params if p else {}
+        ip = i._params if i else _NOPARAMS
+        pp = p._params if p else _NOPARAMS
 
         self._history = _History_( (ip, ih),
                                     (pp, ph) )
@@ -2376,23 +3115,21 @@ class _RecFunc_Instanced:
         if self.fcall and self.fcall.__doc__:
             self.__doc__ = self.fcall.__doc__
 
-    @classmethod
-    def _derive_derived_cl(cl, p):
-        newcl = type(cl.__name__, (cl,), {})
-        ph = p._history
-        pp = p._params
 
-        h = newcl._history 
+class _RecFuncMaker(_RecObjectMaker):
+    """ make instances of a derived RecFunc, see _RecObjectMaker
 
+    A RecFunc has no childs and its rebased makers share the parameters
+    """
+    __slots__ = ()
 
-        newcl._history = _History_( (h.i_params, h.i), 
-                                      (pp, ph)
-                                     )            
-        return newcl    
+    def rebase(self, p):
+        return self._rebased(p)
 
 class RecFunc(object):
     _default_params = {}
     _derived_cl = False
+    _rcache = None
     def __init__(self, *args, **params):
 
         nposargs, args, kwargs, anyparams = _build_args(args)
@@ -2403,7 +3140,7 @@ class RecFunc(object):
         self.nposargs = nposargs
         self.anyparams = anyparams
 
-        self._params = self._default_params.copy()
+        self._params = _Params(self._default_params)
 
         self.fcall = None
 
@@ -2412,7 +3149,7 @@ class RecFunc(object):
         self.update(params)
 
 
-        self._history = _History_( ({},None), ({},None) )
+        self._history = _History_( (_NOPARAMS,None), (_NOPARAMS,None) )
 
     @property
     def posargnames(self):
@@ -2515,6 +3252,11 @@ class RecFunc(object):
         return self
 
     def _search(self, item, sitem, spath=""):
+        if RESOLUTION_CACHE and not spath:
+            return _cached_search(self, (item, sitem), self._search_walk, item, sitem)
+        return self._search_walk(item, sitem, spath)
+
+    def _search_walk(self, item, sitem, spath=""):
 
         try:
             value = self.locals[item]
@@ -2620,7 +3362,7 @@ class RecFunc(object):
 
     def _derive(self, parent):
         if self._derived_cl:
-            new = self.__class__(None, self, parent, True)
+            new = self._maker(None, self, parent, True)
         else:
             new = self._derive_cl()(None, self, parent, True)
 
@@ -2634,21 +3376,17 @@ class RecFunc(object):
             new.locals.update({k:self.locals[k] for k in self._default_params})
         return new
 
-    @classmethod
-    def _copy_cl(cl):
-        newcl = type(cl.__name__, (cl,), {})
-        #newcl._params = {}
-        return newcl
-
     def _derive_cl(self):
-        cl = self.__class__
+        """ return a maker of derived instances of self """
         if self._derived_cl:
-            newcl = type(cl.__name__, (cl,), self.__dict__)
+            cl = self.__class__
         else:
-            newcl = type(cl.__name__, (_RecFunc_Instanced, cl), self.__dict__)
-        newcl._params = self._default_params.copy()
-        newcl.fcall = staticmethod(self.fcall)
-        return newcl
+            cl = _instanced_class(self.__class__, _RecFunc_Instanced)
+
+        namespace = _class_dict(self)
+        namespace["fcall"] = self.fcall
+        return _RecFuncMaker(cl, namespace, _Params(self._default_params),
+                             self._history)
 
     def derive(self, *args, **params):
         new = self._derive(None)
@@ -2862,21 +3600,66 @@ class RecFunc(object):
             return tuple(args)
 
 
-        getitem = (lambda self,item: self[item,]) if real else (lambda self,item: self[item])
-
-        for i,item in enumerate(self.posargnames[largs:]):
+        names = self.posargnames[largs:]
+        values = iter(self._resolve([item for item in names if item is not None],
+                                    _NOTFOUND, real))
+        for i,item in enumerate(names):
             if item is None:
                 raise TypeError("Missing positional argument to execute, got %d"%largs)
-            try:
-                value = getitem(self,item)
-            except KeyError:
+            value = next(values)
+            if value is _NOTFOUND:
                 raise TypeError("Cannot substitute the %dth positional argument: '%s' is missing"%(i+largs+1,item))
-            else:
-                args.append(value)
+            args.append(value)
         return tuple(args)
 
     parseargs = parseargs
 
+    def _resolve(self, items, default=_NOTFOUND, real=False):
+        """ return the list of self[item] for all items, default if missing
+
+        if real is True the values are returned as they are (self[item,])
+        The resolution cache is validated ones for all items and missing
+        items do not raise any KeyError.
+        """
+        values = _resolution_values(self)
+        locals = self.locals
+        substitutions = self.substitutions
+        program = None
+        out = []
+        for item in items:
+            sitem = substitutions.get(item, item)
+            if not (isinstance(item, basestring) and _is_simple_item(sitem)):
+                try:
+                    out.append(self[item,] if real else self[item])
+                except KeyError:
+                    out.append(default)
+                continue
+
+            key = (item, sitem)
+            found = None if values is None else values.get(key, None)
+            if found is None:
+                value = locals.get(item, _NOTFOUND)
+                if value is not _NOTFOUND:
+                    found = (value, "")
+                else:
+                    # same walk than _search_walk
+                    if program is None:
+                        program = self._history._program()
+                    found = _run_program(program, sitem)
+                    if found[0] is _NOTFOUND:
+                        found = (_NOTFOUND, ("'%s,%s'"%(item,sitem),))
+                if values is not None:
+                    values[key] = found
+            value = found[0]
+            if value is not _NOTFOUND and not real:
+                try:
+                    value = self._return_value(value)
+                except KeyError:
+                    # e.g. an alias to a missing item
+                    value = _NOTFOUND
+            out.append(default if value is _NOTFOUND else value)
+        return out
+
     def getargs(self, *args):
         return self._getargs(False, args)
 
@@ -2886,26 +3669,19 @@ class RecFunc(object):
 
     def _getkwargs(self, real, kwargs, arglist):
         if not self.anyparams:
-            getitem = (lambda self,item: self[item,]) if real else (lambda self,item: self[item])
             if not real:
                 kwargs = {k:self._return_value(value) for k, value in kwargs.iteritems()}
 
-            for k in arglist:
-                if k in kwargs:
-                    continue
-                try:
-                    value = getitem(self,k)
-                except KeyError:
-                    pass
-                else:
+            missing = [k for k in arglist if k not in kwargs]
+            for k, value in zip(missing, self._resolve(missing, _NOTFOUND, real)):
+                if value is not _NOTFOUND:
                     kwargs[k] = value
             return kwargs
         ################################################
         # All kwargs must be parsed
         ################################################
 
-        params = self._history.all()
-        params.update(self.locals)
+        params = _ParamsView(self._history.chain([self.locals])).copy()
 
         if real:
             return params
@@ -2987,6 +3763,8 @@ class RecFunc(object):
 
 
 class RecFuncIterator(object):
+    __slots__ = ("iterables", "scalars", "duplicator", "count", "n", "start")
+
     def __init__(self, duplicator, iterables, scalars, n=None, start=0):
 
         self.iterables = iterables
@@ -3030,6 +3808,8 @@ class RecFuncIterator(object):
 
 
 class _loopbase_(object):
+    __slots__ = ()
+
     def __str__(self):
         return "{name}({obj!r})".format(name=self.__class__.__name__,
                                     obj=self.obj
@@ -3038,6 +3818,8 @@ class _loopbase_(object):
         return self.__str__()
 
 class cycle(_loopbase_):
+    __slots__ = ("obj", "iterator", "cycles", "cycle")
+
     def __init__(self, obj, cycles=100000):
         if inspect.isgenerator(obj):
             raise ValueError("cannot cycle on a generator object")
@@ -3065,6 +3847,8 @@ class cycle(_loopbase_):
 
 
 class fcycle(_loopbase_):
+    __slots__ = ("func", "obj", "cycles", "cycle")
+
     def __init__(self, func, cycles=100000):
         if not hasattr(func, "__call__"):
             raise ValueError("func must be callable")
@@ -3112,6 +3896,8 @@ class lcycle(_loopbase_):
     [p() for p in pf.iter(5)]
     # ['red', 'blue', 'green', 'red', 'blue']
     """
+    __slots__ = ("obj", "iterator", "cvalue", "cycles", "cycle")
+
     def __init__(self, obj, cycles=100000):
         if inspect.isgenerator(obj):
             raise ValueError("cannot cycle on a generator object")
@@ -3147,6 +3933,8 @@ class lcycle(_loopbase_):
 
 
 class loop(_loopbase_):
+    __slots__ = ("obj", "iterator")
+
     def __init__(self, obj):
 
         self.obj = obj
@@ -3162,7 +3950,21 @@ class loop(_loopbase_):
         return  next(self.iterator)
 
 class alias(object):
-    def __init__(self, param_or_func, smalldoc=None):
+    """ a parameter value computed from the object it is read from
+
+    alias("y") return obj["y"], alias(func) return func(obj)
+
+    If memo is True the result is memorized with the items the function read
+    on the object. The function is called again only when one of these items
+    changed (it is not the same python object anymore). The function must
+    read the object only by items (p["x"], p.get("x")), any other access
+    (e.g. a method call) disable the memorization for that call.
+    The result is memorized in the parameters of the object it is read from,
+    so it is freed with the object. An item changed in place (e.g.
+    p["img"][:] = 0) is not seen: set the item again or call forget().
+    hits and misses count the memorized and computed values.
+    """
+    def __init__(self, param_or_func, smalldoc=None, memo=False):
         
         if isinstance(param_or_func, basestring):
             param = param_or_func
@@ -3175,9 +3977,52 @@ class alias(object):
 
             self.func  = param_or_func                            
         self.smalldoc = smalldoc
+        self.memo = memo
+        self.hits = 0
+        self.misses = 0
+        # incremented by forget, the older memos are ignored
+        self._generation = 0
 
     def get(self, obj):
-        return self.func(obj)      
+        if not self.memo:
+            return self.func(obj)
+        params = getattr(obj, "_params", None)
+        if not isinstance(params, _Params):
+            # nowhere to keep the value
+            return self.func(obj)
+
+        memos = params.memos
+        memo = None if memos is None else memos.get(self, None)
+        if memo is not None and memo[0] == self._generation:
+            _, reads, value = memo
+            for key, read in reads:
+                try:
+                    current = obj[key]
+                except KeyError:
+                    current = _NOTFOUND
+                if current is not read:
+                    break
+            else:
+                self.hits += 1
+                _alias_stats["hits"] += 1
+                return value
+
+        self.misses += 1
+        _alias_stats["misses"] += 1
+        if memo is not None:
+            # do not keep the previous value alive during the call
+            del memos[self]
+        reader = _AliasReader(obj)
+        value = self.func(reader)
+        if not reader.opaque:
+            if memos is None:
+                memos = params.memos = {}
+            memos[self] = (self._generation, tuple(reader.reads), value)
+        return value
+
+    def forget(self):
+        """ forget the memorized values, e.g. after an in place change """
+        self._generation += 1
 
     def __str__(self):
         return "<alias>" if self.smalldoc is None else self.smalldoc
@@ -3185,14 +4030,59 @@ class alias(object):
     def __repr__(self):
         return self.__str__()
 
+_alias_stats = {"hits":0, "misses":0}
 
-def _colect_rec_childs(obj, glob="*"):
+def alias_stats(reset=False):
+    """ return a dictionary of the hits and misses of all the memo aliases
 
-    if has_magic_lst(glob):
-        patterns = lst_pattern(glob)
-        matcher = lambda k: lst_match(k, patterns)
-    else:    
-        matcher = lambda k: fnmatch.fnmatch(k, glob)
+    if reset is True the counters are set back to 0
+    """
+    stats = dict(_alias_stats)
+    if reset:
+        _alias_stats.update(hits=0, misses=0)
+    return stats
+
+class _AliasReader(object):
+    """ record the items read by a memo alias function on obj """
+    __slots__ = ("obj", "reads", "opaque")
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.reads = []
+        self.opaque = False
+
+    def __getitem__(self, key):
+        try:
+            value = self.obj[key]
+        except KeyError:
+            self.reads.append((key, _NOTFOUND))
+            raise
+        self.reads.append((key, value))
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getattr__(self, attr):
+        # not an item, the result cannot be memorized
+        self.opaque = True
+        return getattr(self.obj, attr)
+
+
+def _colect_rec_childs(obj, glob="*", matcher=None):
+
+    if matcher is None:
+        matcher = _compile_matcher(glob)
 
     lst = []
     cl = obj.__class__
@@ -3373,6 +4263,38 @@ def __test__():
     test(20, pp0.p00["mark"], "++")
     pp0.derive().p00["mark"] = "--"
     test(21, pp0.p00["mark"], "++")
+    ## resolution cache must give the same results than the hierarchy walk
+    global RESOLUTION_CACHE
+    objs = [p0, ip0, pp0, p0.p00, p0().p00(), p0.p00.p000, ip0.p00.p000,
+            p0.p00.p001, pp0.derive().p00, data.p0.p00]
+    keys = ["color", "fmt", "style", "mark", "zoro", "__inerit__", "notthere"]
+    def lookups():
+        return [o.get(k, "?") for o in objs for k in keys]
+    RESOLUTION_CACHE = False
+    uncached = lookups()
+    RESOLUTION_CACHE = True
+    test(22, True, lookups()==uncached)
+    p0["color"] = "green"
+    del p0.p00["color"]
+    RESOLUTION_CACHE = False
+    uncached = lookups()
+    RESOLUTION_CACHE = True
+    test(23, True, lookups()==uncached)
+    p0.p00.clear()
+    p0.p00.update(color="orange", fmt="k.")
+    RESOLUTION_CACHE = False
+    uncached = lookups()
+    RESOLUTION_CACHE = True
+    test(24, True, lookups()==uncached)
+
+    ## parsed paths are cached, results must not change on second access
+    for i in range(2):
+        test(25+i/10., p0["p00.p000|style"], "***")
+    for i in range(2):
+        test(26+i/10., len(p0["p00.(p000,p001)"]), 2)
+    for i in range(2):
+        test(27+i/10., p0["p00|fmt"], "k.")
+
     import gc
 
     def inc1(wr):
@@ -3393,3 +4315,73 @@ def __test__():
 
     print("1. on 999", acumulator1, "deleted correctly")
     print("2. on 999", acumulator2, "deleted correctly")
+
+    ## derived instances are made from one class per RecObject class
+    test(28, len(P0.__subclasses__()), 1)
+    test(29, len(P0.P00.__subclasses__()), 1)
+    test(30, type(data.p0.p00) is type(Data().p0.p00), True)
+    ## the per instance state is in slots not in the instance __dict__
+    test(31, [k for k in _INSTANCE_SLOTS if k in data.p0.p00.__dict__], [])
+
+    ## memo alias are computed again only when a read item changed
+    ma = alias(lambda p: [p["a"], p.get("b", 0)], memo=True)
+    mo = P0()
+    mo.update(a=1, s=ma)
+    for i in range(3):
+        test(32+i/10., mo.p00["s"], [1, 0])
+    test(33, (ma.misses, ma.hits), (1, 2))
+    mo["b"] = 2
+    test(34, mo.p00["s"], [1, 2])
+    mo.p00["a"] = 3
+    test(35, (mo.p00["s"], mo["s"]), ([3, 2], [1, 2]))
+    test(36, ma.misses, 4)
+    ## a change in place is seen only after forget
+    ml = alias(lambda p: sum(p["l"]), memo=True)
+    mo.update(l=[1, 2], t=ml)
+    test(36.1, mo["t"], 3)
+    mo["l"].append(3)
+    test(36.2, mo["t"], 3)
+    ml.forget()
+    test(36.3, mo["t"], 6)
+
+    ## bulk resolution must give the same results than item by item
+    for cached in [False, True]:
+        RESOLUTION_CACHE = cached
+        test(37+cached/10., True, all(
+             o._resolve(keys, "?") == [o.get(k, "?") for k in keys] for o in objs))
+
+    ## compiled go plans give the same output than go
+    class G0(RecObject):
+        f = RecFunc().caller(lambda : 1)
+        p00 = P0.P00()
+        p00.g = RecFunc().caller(lambda : 2)
+    g0 = G0()
+    g0["-all"] = ["f", "p00:g", "p00|-x"]
+    g0.p00["-x"] = ["g"]
+    plan = compile_go("-all; f", "p00.g")
+    test(38, plan(g0), g0.go("-all; f", "p00.g"))
+    g1 = G0()
+    g1["-all"] = ["f"]
+    test(39, sorted(plan(g1)), ['.f', '.p00.g'])
+
+    ## all is a dictionary copy, the internal view follows the hierarchy
+    view = p0.p00._all_view()
+    p0["newkey"] = 1
+    test(40, (view.get("newkey"), p0.p00.all["newkey"]), (1, 1))
+    test(41, p0.p00.all, dict(view.iteritems()))
+    del p0["newkey"]
+    test(42, ("newkey" in view, "newkey" in p0.p00.all), (False, False))
+
+    ## keys holding cycles are indexed for reset
+    cy = P0()
+    cy["c"] = cycle([1, 2])
+    next(cy["c"])
+    cy2 = cy.derive()
+    cy2.reset()
+    test(43, (next(cy2["c"]), "c" in cy2.locals), (1, True))
+    test(44, cy.locals.cycles, set(["c"]))
+    del cy["c"]
+    test(45, cy.locals.cycles, set())
+    cy.locals.update([("d", cycle([1])), ("e", 1)], f=loop([1]))
+    cy.update(d=2)
+    test(46, cy.locals.cycles, set(["f"]))
@@ -0,0 +1,269 @@
+""" the binedstat engines give the statistics of scipy.stats.binned_statistic
+and binned_statistic_2d
+
+run from the directory holding the package:
+    python -m unittest discover -s smartplotlib/tests -t .
+"""
+from __future__ import division, absolute_import, print_function
+
+import os
+import subprocess
+import sys
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+
+from ..binedstatplot import (binedstat, binedstat2d, BinedMoments, _statbin,
+                             _statbin2d, _stream_moments, _BinMoments,
+                             _QuantileSketch)
+
+try:
+    from scipy.stats import binned_statistic, binned_statistic_2d
+except ImportError:
+    binned_statistic = binned_statistic_2d = None
+
+STATS = ["mean", "std", "count", "sum", "min", "max"]
+
+def _exact(fstat):
+    """ the scipy statistic, std by np.std in each bin: the "std" of
+    binned_statistic loses the precision of data far from 0
+    """
+    return (lambda a: np.std(a)) if fstat == "std" else fstat
+
+
+class _StatbinCase(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.x = rs.rand(5000)*100
+        # some empty bins and bins of one value
+        self.x[self.x > 90] = 95
+        self.v = rs.randn(5000)*3+self.x
+
+    def assertSameStat(self, fstat, bins=40, bin_range=(0, 100), scipy_fstat=None):
+        bins, stat, err = _statbin(self.x, self.v, fstat, bins, bin_range)
+        stat0, edges0, _ = binned_statistic(self.x, self.v, scipy_fstat or fstat,
+                                            bins, bin_range)
+        np.testing.assert_allclose(bins, edges0)
+        np.testing.assert_allclose(stat, stat0, rtol=1e-10, atol=1e-12)
+
+    def assertSameNaN(self, fstats, scipy_fstats={}):
+        v = self.v.copy()
+        v[::97] = np.nan
+        for fstat in fstats:
+            stat = _statbin(self.x, v, fstat, 20, (0, 100))[1]
+            stat0 = binned_statistic(self.x, v, scipy_fstats.get(fstat, fstat),
+                                     20, (0, 100))[0]
+            np.testing.assert_array_equal(np.isnan(stat), np.isnan(stat0))
+            np.testing.assert_allclose(stat[~np.isnan(stat)], stat0[~np.isnan(stat0)])
+
+
+@unittest.skipIf(binned_statistic is None, "needs scipy.stats")
+class StatbinTest(_StatbinCase):
+    def test_stats(self):
+        for fstat in STATS:
+            self.assertSameStat(fstat)
+            self.assertSameStat(fstat, np.sort(np.r_[0, 100, np.random.rand(20)*100]))
+
+    def test_functions(self):
+        for func in [np.mean, np.std, np.min, np.max, np.sum, len]:
+            self.assertSameStat(func)
+        self.assertSameStat(lambda v: np.percentile(v, 20))
+
+    def test_errors(self):
+        _, stat, err = _statbin(self.x, self.v, "mean", 20, (0, 100), binerror=True,
+                                sigma=2.0)
+        std, _, _ = binned_statistic(self.x, self.v, "std", 20, (0, 100))
+        count, _, _ = binned_statistic(self.x, self.v, "count", 20, (0, 100))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            np.testing.assert_allclose(err, 2.0*std/np.sqrt(count))
+
+    def test_nan(self):
+        self.assertSameNaN(["mean", "min", "max"])
+
+    def test_factory(self):
+        p = binedstat(self.v, self.x, fstat="mean", bins=25)
+        stat0, edges0, _ = binned_statistic(self.x, self.v, "mean", 25)
+        np.testing.assert_allclose(p["hist"], stat0)
+        np.testing.assert_allclose(p["bins"], edges0)
+
+
+@unittest.skipIf(binned_statistic is None, "needs scipy.stats")
+class QuantileTest(_StatbinCase):
+    def test_median(self):
+        self.assertSameStat("median")
+        self.assertSameStat("median", np.sort(np.r_[0, 100, np.random.rand(20)*100]))
+        self.assertSameStat(np.median)
+
+    def test_percentile(self):
+        for q in [0, 10, 33.3, 90, 100]:
+            self.assertSameStat("p%g"%q, scipy_fstat=lambda v: np.percentile(v, q))
+
+    def test_nan(self):
+        self.assertSameNaN(["median", "p75"], {"p75": lambda a: np.percentile(a, 75)})
+
+    def test_factory(self):
+        p = binedstat(self.v, self.x, fstat="median", bins=25)
+        stat0, edges0, _ = binned_statistic(self.x, self.v, "median", 25)
+        np.testing.assert_allclose(p["hist"], stat0)
+        np.testing.assert_allclose(p["bins"], edges0)
+
+    def test_sketch(self):
+        rs = np.random.RandomState(2)
+        x, v = rs.rand(50000), rs.randn(50000)
+        sketch = _QuantileSketch(x, v, 10, (0, 1), 500, chunksize=3000)
+        tol = 2*(v.max()-v.min())/500
+        for q in [10, 50, 90]:
+            stat0 = binned_statistic(x, v, lambda a: np.percentile(a, q), 10, (0, 1))[0]
+            np.testing.assert_allclose(sketch.percentile(q), stat0, atol=tol)
+        np.testing.assert_array_equal(sketch.count, np.histogram(x, 10, (0, 1))[0])
+        stat0 = binned_statistic(x, v, "median", 10, (0, 1))[0]
+        np.testing.assert_allclose(_statbin(x, v, "median", 10, (0, 1), sketch=500)[1],
+                                   stat0, atol=tol)
+
+
+@unittest.skipIf(binned_statistic is None, "needs scipy.stats")
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(1)
+        self.x = rs.rand(20000)*10
+        self.v = rs.randn(20000)+1e6
+
+    def test_moments(self):
+        edges = np.linspace(0, 10, 31)
+        moments = BinedMoments(30, (0, 10))
+        for i in range(0, self.x.size, 1234):
+            moments.add(self.x[i:i+1234], self.v[i:i+1234])
+        for fstat in ["mean", "std", "sum", "count"]:
+            stat0 = binned_statistic(self.x, self.v, _exact(fstat), edges)[0]
+            np.testing.assert_allclose(_statbin(None, None, fstat, moments=moments)[1],
+                                       stat0, rtol=1e-9)
+
+    def test_merge(self):
+        whole = _BinMoments(self.x, self.v, 30, (0, 10))
+        parts = _stream_moments(self.x, self.v.view(np.memmap), 30, (0, 10), 777, 3)
+        np.testing.assert_array_equal(parts.count, whole.count)
+        np.testing.assert_allclose(parts.mean, whole.mean, rtol=1e-12)
+        np.testing.assert_allclose(parts.std, whole.std, rtol=1e-9)
+        self.assertRaises(ValueError, parts.merge, BinedMoments(10, (0, 10)))
+
+    def test_factory(self):
+        chunks = iter(np.array_split(self.v, 9))
+        p = binedstat(chunks, iter(np.array_split(self.x, 9)), fstat="std", bins=30,
+                      min=0, max=10, chunksize=1000)
+        stat0 = binned_statistic(self.x, self.v, _exact("std"), 30, (0, 10))[0]
+        np.testing.assert_allclose(p["hist"], stat0, rtol=1e-9)
+        self.assertRaises(ValueError, binedstat, iter([self.v]), None, fstat="median",
+                          bins=30, min=0, max=10)
+
+    def test_memmap(self):
+        v = self.v.view(np.memmap)
+        p90 = lambda a: np.percentile(a, 90)
+        for fstat, func in [("median", "median"), ("p90", p90), ("min", "min"),
+                            (np.median, "median"), (p90, p90), ("std", _exact("std"))]:
+            p = binedstat(v, self.x, fstat=fstat, bins=30, min=0, max=10)
+            stat0 = binned_statistic(self.x, self.v, func, 30, (0, 10))[0]
+            np.testing.assert_allclose(p["hist"], stat0, rtol=1e-9)
+        self.assertIn("moments", binedstat(v, self.x, fstat="std", bins=30))
+        self.assertNotIn("moments", binedstat(v, self.x, fstat="median", bins=30))
+        p = binedstat(v, self.x, fstat="median", bins=30, min=0, max=10, sketch=500)
+        stat0 = binned_statistic(self.x, self.v, "median", 30, (0, 10))[0]
+        np.testing.assert_allclose(p["hist"], stat0, atol=2*np.ptp(self.v)/500)
+
+
+@unittest.skipIf(binned_statistic_2d is None, "needs scipy.stats")
+class Statbin2dTest(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(3)
+        self.x, self.y = rs.randn(8000), rs.randn(8000)
+        self.z = rs.randn(8000)+self.x
+
+    def test_stats(self):
+        for bins in [12, [7, 9]]:
+            for fstat in STATS+["median", "p90", np.std]:
+                func = {"p90": lambda a: np.percentile(a, 90)}.get(fstat, fstat)
+                stat, count, xedges, yedges = _statbin2d(self.x, self.y, self.z, fstat, bins)
+                stat0, xedges0, yedges0, _ = binned_statistic_2d(self.x, self.y, self.z,
+                                                                 func, bins)
+                np.testing.assert_allclose(stat, stat0, rtol=1e-10, atol=1e-12)
+                np.testing.assert_array_equal(xedges, xedges0)
+                np.testing.assert_array_equal(yedges, yedges0)
+
+    def test_streamed(self):
+        stat0 = binned_statistic_2d(self.x, self.y, self.z, "std", 10)[0]
+        for workers in [None, 3]:
+            stat = _statbin2d(self.x, self.y, self.z, "std", 10, chunksize=500,
+                              workers=workers)[0]
+            np.testing.assert_allclose(stat, stat0, rtol=1e-9)
+
+    def test_factory(self):
+        p = binedstat2d(self.x, self.y, self.z, fstat="mean", bins=[6, 4], cmin=5)
+        stat0 = binned_statistic_2d(self.x, self.y, self.z, "mean", [6, 4])[0]
+        count0 = binned_statistic_2d(self.x, self.y, self.z, "count", [6, 4])[0]
+        stat0[count0 < 5] = np.nan
+        np.testing.assert_allclose(p["hist"], stat0)
+        np.testing.assert_array_equal(p["count"], count0)
+        np.testing.assert_allclose(p["colors"], stat0.T)
+        self.assertIs(p["Z"], p["colors"])
+        np.testing.assert_array_equal(p["X"][0], p["xedges"][:-1])
+        np.testing.assert_array_equal(p["Y"][:, 0], p["yedges"][:-1])
+
+
+# run in a new process, print the extra peak memory of ybinedstat as a
+# multiple of the input size: the tracemalloc peak if available, else the
+# peak resident memory
+MEMORY_SCRIPT = """
+import resource, sys
+import numpy as np
+from %s import xyplot
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def peak():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM"):
+                    return int(line.split()[1])*1024
+    except IOError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+rs = np.random.RandomState(0)
+x, y = rs.rand(int(sys.argv[1])), rs.rand(int(sys.argv[1]))
+if tracemalloc is not None:
+    tracemalloc.start()
+base = peak()
+p = xyplot(x, y).ybinedstat(fstat=sys.argv[2], bins=100)
+p["y"]
+if tracemalloc is not None:
+    extra = tracemalloc.get_traced_memory()[1]
+else:
+    extra = peak()-base
+print(extra/float(x.nbytes+y.nbytes))
+"""
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "peak memory read in /proc")
+class MemoryTest(unittest.TestCase):
+    def peak(self, fstat, n=5*10**6):
+        package = __name__.split(".")[0]
+        top = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, PYTHONPATH=top, MPLBACKEND="Agg")
+        out = subprocess.check_output([sys.executable, "-W", "ignore", "-c",
+                                       MEMORY_SCRIPT%package, str(n), fstat], env=env)
+        return float(out.split()[-1])
+
+    def test_ybinedstat(self):
+        # about 0.8x the x+y input for the moments (the bin index is the
+        # only array of the input size), 1.8x with the sort of the median,
+        # 3x before
+        for fstat in ["mean", "std"]:
+            self.assertLess(self.peak(fstat), 1.2)
+        self.assertLess(self.peak("median"), 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,319 @@
+""" the histogram engines give the counts and edges of np.histogram and
+np.histogram2d
+
+run from the directory holding the package:
+    python -m unittest discover -s smartplotlib/tests -t .
+"""
+from __future__ import division, absolute_import, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+
+from ..histogram import (histogram, histograms, histogramstack, histogram2d,
+                         LiveHistogram, _uniform_histogram, _parallel_histogram,
+                         _stream_histogram, _histogram2d_counts, AUTOFAST)
+from ..datafile import DataFile
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+def _random_cases(n, seed=0):
+    """ yield data, bins, range of random histograms: float64, float32
+    and int data, a range or not, values on the edges
+    """
+    rs = np.random.RandomState(seed)
+    for i in range(n):
+        dtype = [np.float64, np.float32, np.int32][i%3]
+        scale = 10.0**rs.randint(-3, 6)
+        data = rs.randn(rs.randint(0, 300))*scale+rs.choice([0, 1, 1000])*scale
+        if rs.rand() < 0.3:
+            # many values on the edges
+            data = np.round(data*4)/4
+        data = data.astype(dtype)
+        bin_range = None
+        if data.size and rs.rand() < 0.4:
+            bin_range = (float(np.percentile(data, 10)),
+                         float(np.percentile(data, 90))+rs.rand())
+        yield data, rs.randint(1, 200), bin_range
+
+
+class _HistogramCase(unittest.TestCase):
+    def assertSameHistogram(self, result, expected):
+        counts, edges = result
+        counts0, edges0 = expected
+        self.assertEqual(edges.dtype, edges0.dtype)
+        np.testing.assert_array_equal(edges, edges0)
+        np.testing.assert_array_equal(counts, counts0)
+
+
+class StreamTest(_HistogramCase):
+    def test_numpy(self):
+        for data, nbins, bin_range in _random_cases(600):
+            self.assertSameHistogram(_stream_histogram(data.view(np.memmap), nbins,
+                                                       bin_range, None, 37),
+                                     np.histogram(data, nbins, bin_range))
+
+    def test_iterator(self):
+        data = np.random.RandomState(2).randn(20000)
+        chunks = iter(np.array_split(data, 7))
+        h = histogram(chunks, bins=30, range=(-3, 3), chunksize=1000)
+        np.testing.assert_array_equal(h["counts"], np.histogram(data, 30, (-3, 3))[0])
+        self.assertRaises(ValueError, histogram, iter([data]), bins=30)
+
+
+class LiveHistogramTest(unittest.TestCase):
+    def test_add(self):
+        chunks = np.array_split(np.random.RandomState(5).randn(3000), 4)
+        live = LiveHistogram(bins=12, range=(-3, 3))
+        for chunk in chunks:
+            live.add(chunk, autoscale=False)
+        counts0 = np.histogram(np.concatenate(chunks), 12, (-3, 3))[0]
+        np.testing.assert_array_equal(live.plot["counts"], counts0)
+        np.testing.assert_array_equal(live.plot["hist"], counts0)
+
+
+class UniformEngineTest(_HistogramCase):
+    def test_numpy(self):
+        for data, nbins, bin_range in _random_cases(600):
+            self.assertSameHistogram(_uniform_histogram(data, nbins, bin_range),
+                                     np.histogram(data, nbins, bin_range))
+
+    def test_nan(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            counts, edges = _uniform_histogram(np.array([1, np.nan, 2, 3]), 2)
+        np.testing.assert_array_equal(counts, [1, 2])
+        np.testing.assert_array_equal(edges, [1, 2, 3])
+        counts, edges = _uniform_histogram(np.array([np.nan]), 2)
+        np.testing.assert_array_equal(edges, [0, 0.5, 1])
+
+    def test_not_finite(self):
+        for data in ([1, 2, np.inf, 3], [-np.inf, 1.], [np.inf]):
+            data = np.array(data)
+            self.assertRaises(ValueError, np.histogram, data, 3)
+            self.assertRaises(ValueError, _uniform_histogram, data, 3)
+        self.assertRaises(ValueError, _uniform_histogram, np.arange(3.), 3, (0, np.inf))
+
+    def test_empty(self):
+        for bin_range in [None, (1, 2)]:
+            counts, edges = _uniform_histogram(np.zeros(0), 4, bin_range)
+            counts0, edges0 = np.histogram(np.zeros(0), 4, bin_range)
+            np.testing.assert_array_equal(counts, counts0)
+            np.testing.assert_array_equal(edges, edges0)
+
+
+class HistogramFactoryTest(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.RandomState(2).randn(20000)
+
+    def test_bins(self):
+        data = self.data
+        for bins in [10, np.linspace(-3, 2, 17), "auto", "fd"]:
+            h = histogram(data, bins=bins)
+            counts0, edges0 = np.histogram(data, bins)
+            np.testing.assert_array_equal(h["counts"], counts0)
+            np.testing.assert_allclose(h["bins"], edges0)
+
+    def test_density(self):
+        h = histogram(self.data, bins=20, density=True)
+        np.testing.assert_allclose(h["hist"], np.histogram(self.data, 20, density=True)[0])
+
+
+class WorkersTest(_HistogramCase):
+    def test_numpy(self):
+        for data, nbins, bin_range in _random_cases(600):
+            self.assertSameHistogram(_parallel_histogram(data, nbins, bin_range,
+                                                         None, 3),
+                                     np.histogram(data, nbins, bin_range))
+
+    def test_not_finite(self):
+        for data in ([1, 2, np.inf, 3], [-np.inf, 1.], [np.inf]):
+            self.assertRaises(ValueError, _parallel_histogram, np.array(data), 3,
+                              None, None, 2)
+
+    def test_factory(self):
+        data = np.random.RandomState(2).randn(20000)
+        w = np.ones(data.size)*0.5
+        for workers in [1, 3]:
+            h = histogram(data, bins=25, weights=w, workers=workers)
+            np.testing.assert_allclose(h["counts"], np.histogram(data, 25, weights=w)[0])
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.RandomState(4).randn(6, 3000)
+
+    def test_histograms(self):
+        plots = histograms(self.data, bins=15, range=(-3, 3))
+        for plot, row in zip(plots, self.data):
+            np.testing.assert_array_equal(plot["counts"], np.histogram(row, 15, (-3, 3))[0])
+
+    def test_histogramstack(self):
+        p = histogramstack(self.data, bins=15)
+        edges = np.histogram_bin_edges(self.data, 15)
+        for h, row in zip(p["hist"], self.data):
+            np.testing.assert_array_equal(h, np.histogram(row, edges)[0])
+        X, Y = np.meshgrid(p["xedges"], p["yedges"])
+        np.testing.assert_array_equal(p["X"], X[:-1, :-1])
+        np.testing.assert_array_equal(p["Y"], Y[:-1, :-1])
+
+
+class GeometryTest(unittest.TestCase):
+    def setUp(self):
+        self.data = np.array([0.5, 1.5, 1.6, 2.5, 2.5, 2.5])
+
+    def test_polygon(self):
+        h = histogram(self.data, bins=[0., 1, 2, 3])
+        geometry = h["geometry"]
+        self.assertIsNone(geometry._x)
+        np.testing.assert_array_equal(h.fill["x"], [0, 0, 1, 1, 2, 2, 3, 3, 2, 2, 1, 1, 0])
+        np.testing.assert_array_equal(h.fill["y"], [0, 1, 1, 2, 2, 3, 3, 0, 0, 0, 0, 0, 0])
+        np.testing.assert_array_equal(h.bar["width"], [1, 1, 1])
+        y = h.fill["y"]
+        h["hist"] *= 2
+        geometry.update()
+        self.assertIs(h.fill["y"], y)
+        np.testing.assert_array_equal(y[1:7], [2, 2, 4, 4, 6, 6])
+
+    def test_log(self):
+        h = histogram(self.data, bins=[0., 1, 2, 3], log=True)
+        np.testing.assert_allclose(h.fill["y"], [0.1, 1, 1, 2, 2, 3, 3]+[0.1]*6)
+
+    def test_float32(self):
+        data = np.random.RandomState(2).randn(20000).astype(np.float32)
+        h = histogram(data, bins=20)
+        self.assertEqual((h["bins"].dtype, h["hist"].dtype, h.fill["x"].dtype),
+                         (np.dtype(np.float32),)*3)
+
+    def test_float16(self):
+        data = np.random.RandomState(2).randn(10000).astype(np.float16)
+        h = histogram(data, bins=10)
+        self.assertEqual(h["bins"].dtype, np.dtype(float))
+        np.testing.assert_array_equal(h["hist"], h["counts"])
+        np.testing.assert_array_equal(h["hist"], np.histogram(data, h["bins"])[0])
+
+    def test_int_edges(self):
+        for bins in [[0, 1, 2, 3], np.arange(-3, 4), (0, 1, 2), [-1, 0, 1]]:
+            h = histogram(self.data, bins=bins, rwidth=0.5)
+            edges = np.asarray(bins, float)
+            np.testing.assert_array_equal(h["x"], 0.5*(edges[:-1]+edges[1:]))
+            np.testing.assert_array_equal(h["hist"], np.histogram(self.data, bins)[0])
+            np.testing.assert_array_equal(h.bar["width"], 0.5*np.diff(edges))
+            self.assertEqual(h.fill["x"].dtype, np.dtype(float))
+
+
+class SumW2Test(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(1)
+        self.data, self.w = rs.randn(5000), rs.rand(5000)
+
+    def test_engine(self):
+        data, w = self.data, self.w
+        (counts, sumw2), edges = _uniform_histogram(data, 30, (-2, 2), w, sumw2=True)
+        counts0, edges0 = np.histogram(data, 30, (-2, 2), weights=w)
+        np.testing.assert_allclose(counts, counts0)
+        np.testing.assert_allclose(sumw2, np.histogram(data, 30, (-2, 2), weights=w*w)[0])
+
+    def test_factory(self):
+        data, w = self.data, self.w
+        for workers in [None, 3]:
+            h = histogram(data, bins=25, weights=w, workers=workers)
+            np.testing.assert_allclose(h["sumw2"], np.histogram(data, 25, weights=w*w)[0])
+            np.testing.assert_allclose(h["yerr"], np.sqrt(h["sumw2"]))
+
+
+class AutoFastTest(unittest.TestCase):
+    def test_bins(self):
+        data = np.random.RandomState(2).randn(20000)
+        h = histogram(data, bins=AUTOFAST)
+        edges = h["bins"]
+        self.assertEqual((edges[0], edges[-1]), (data.min(), data.max()))
+        auto = len(np.histogram_bin_edges(data, "auto"))-1
+        self.assertTrue(0.5*auto <= len(edges)-1 <= 2*auto)
+        self.assertEqual(h["counts"].sum(), data.size)
+
+
+class Histogram2dTest(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(6)
+        self.x = rs.randn(20000)
+        self.y = self.x+rs.randn(20000)
+        self.w = rs.rand(20000)
+
+    def test_numpy(self):
+        x, y = self.x, self.y
+        for bins, bin_range in [(10, None), ([15, 7], [(-2, 2), (-3, 3)]),
+                                ([np.linspace(-2, 2, 9), 20], None)]:
+            h0, xe0, ye0 = np.histogram2d(x, y, bins, bin_range)
+            for workers in [None, 3]:
+                h, xe, ye = _histogram2d_counts(x, y, bins, bin_range, workers=workers,
+                                                chunksize=777)
+                np.testing.assert_array_equal(h, h0)
+                np.testing.assert_array_equal(xe, xe0)
+                np.testing.assert_array_equal(ye, ye0)
+
+    def test_weights(self):
+        h0 = np.histogram2d(self.x, self.y, 12, normed=True, weights=self.w)[0]
+        h = _histogram2d_counts(self.x, self.y, 12, normed=True, weights=self.w)[0]
+        np.testing.assert_allclose(h, h0)
+
+    @unittest.skipIf(scipy is None, "needs scipy.sparse")
+    def test_sparse(self):
+        h0 = np.histogram2d(self.x, self.y, 300)[0]
+        h = _histogram2d_counts(self.x, self.y, 300, sparse=True, workers=2,
+                                chunksize=1000)[0]
+        np.testing.assert_array_equal(h.toarray(), h0)
+        p = histogram2d(self.x, self.y, bins=300, sparse=True)
+        np.testing.assert_array_equal(p["colors"], h0.T)
+        # one dense image for colors and Z
+        self.assertIs(p["Z"], p["colors"])
+
+    def test_not_finite(self):
+        x = np.array([1, 2, np.inf, 3.])
+        self.assertRaises(ValueError, _histogram2d_counts, x, self.x[:4])
+
+    def test_factory(self):
+        p = histogram2d(self.x, self.y, bins=[8, 5], cmin=1)
+        h0 = np.histogram2d(self.x, self.y, [8, 5])[0]
+        # as before, the bins under cmin are NaN in hist too
+        h0[h0 < 1] = np.nan
+        np.testing.assert_array_equal(p["hist"], h0)
+        np.testing.assert_array_equal(p["colors"], h0.T)
+        self.assertEqual(p["X"].shape, (5, 8))
+
+
+class DataFileTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.data = np.random.RandomState(3).randn(10000)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_npy_and_raw(self):
+        npy = os.path.join(self.dir, "data.npy")
+        np.save(npy, self.data.astype(np.float32))
+        raw = os.path.join(self.dir, "data.f8")
+        self.data.tofile(raw)
+        for source, data in [(DataFile(npy), self.data.astype(np.float32)),
+                             (DataFile(raw), self.data)]:
+            self.assertEqual(source.shape, data.shape)
+            h = histogram(source, bins=40, workers=2)
+            counts0, edges0 = np.histogram(data, 40)
+            np.testing.assert_array_equal(h["counts"], counts0)
+            np.testing.assert_array_equal(h["bins"], edges0)
+            self.assertIs(h["data"], source)
+
+
+if __name__ == "__main__":
+    unittest.main()
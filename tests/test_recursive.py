@@ -0,0 +1,404 @@
+""" the caches and fast paths of recursive give the results of the plain
+hierarchy walk
+
+run from the directory holding the package:
+    python -m unittest discover -s smartplotlib/tests -t .
+"""
+from __future__ import division, absolute_import, print_function
+
+import gc
+import sys
+import threading
+import unittest
+import weakref
+
+from .. import recursive
+from ..base import PlotFactory
+from ..recursive import (RecObject, RecFunc, CatRecObject, RecFuncIterator,
+                         alias, cycle, loop, compile_go, parseargs, _History_,
+                         _Params, _LRUCache)
+
+KEYS = ["color", "fmt", "style", "mark", "zoro", "__inerit__", "notthere"]
+
+def _tree():
+    """ a new class hierarchy of RecObject and RecFunc """
+    class P0(RecObject):
+        @staticmethod
+        def finit(plot, **kwargs):
+            plot.update(kwargs)
+            plot["zoro"] = 100
+
+        class P00(RecObject):
+            class P000(RecObject):
+                pass
+            class P001(RecFunc):
+                pass
+            p000 = P000()
+            p001 = P001()
+        p00 = P00()
+        p00["fmt"] = "b+"
+    return P0
+
+
+class _CacheSwitch(unittest.TestCase):
+    """ restore the RESOLUTION_CACHE flag after each test """
+    def setUp(self):
+        self._cache_flag = recursive.RESOLUTION_CACHE
+
+    def tearDown(self):
+        recursive.RESOLUTION_CACHE = self._cache_flag
+
+    def lookups(self, objs, cached):
+        recursive.RESOLUTION_CACHE = cached
+        return [o.get(k, "?") for o in objs() for k in KEYS]
+
+    def assertSameLookups(self, objs):
+        self.assertEqual(self.lookups(objs, True), self.lookups(objs, False))
+
+
+class ResolutionCacheTest(_CacheSwitch):
+    def test_invalidation(self):
+        P0 = _tree()
+        p0 = P0()
+        p0["color"] = "red"
+        ip0 = p0()
+        kept = [p0, ip0, p0.p00, ip0.p00, p0.p00.p000, ip0.p00.p000,
+                p0.p00.p001, p0().p00()]
+        objs = lambda: kept+[p0.p00, p0().p00.p000, p0.derive().p00, ip0.p00.p001]
+
+        self.assertSameLookups(objs)
+        changes = [
+            lambda: p0.__setitem__("color", "green"),
+            lambda: p0.p00.__setitem__("color", "blue"),
+            lambda: ip0.__setitem__("mark", "o"),
+            lambda: p0.p00.__delitem__("color"),
+            lambda: P0.P00.p000.__setitem__("style", "--"),
+            lambda: p0.p00.p000.__setitem__("style", "***"),
+            lambda: p0.p00.update(fmt="k.", mark="+"),
+            lambda: p0.p00.setdefault("zoro", 1),
+            lambda: p0.pop("color"),
+            lambda: p0.p00.clear(),
+            lambda: p0.__setitem__("__inerit__", ["fmt"]),
+            lambda: p0.p00.__setitem__("__inerit__", ["color", "style"]),
+        ]
+        for change in changes:
+            change()
+            self.assertSameLookups(objs)
+
+    def test_values(self):
+        P0 = _tree()
+        p0 = P0()
+        p0["color"] = "red"
+        p0.p00["color"] = "violet"
+        recursive.RESOLUTION_CACHE = True
+        self.assertEqual(p0["color"], "red")
+        self.assertEqual(p0.p00.p001["color"], "violet")
+        ip0 = p0()
+        ip0["color"] = "blue"
+        self.assertEqual((ip0["color"], p0["color"], ip0["zoro"]), ("blue", "red", 100))
+        self.assertRaises(KeyError, lambda: p0.p00["notthere"])
+
+
+class PathCacheTest(unittest.TestCase):
+    paths = ["p00.p000|style", "p00|fmt", "p00.p000|fmt", "p00.p001|fmt",
+             "p00.(p000,p001)", "p00.p000|notthere"]
+
+    def setUp(self):
+        P0 = _tree()
+        self.p0 = p0 = P0()
+        p0.p00.p000["style"] = "***"
+
+    def read(self):
+        out = []
+        for path in self.paths:
+            try:
+                value = self.p0[path]
+            except KeyError:
+                value = KeyError
+            out.append(len(value) if isinstance(value, CatRecObject) else value)
+        return out
+
+    def test_cached(self):
+        recursive._objpath_cache.clear()
+        recursive._itempath_cache.clear()
+        first = self.read()
+        self.assertEqual(first, ["***", "b+", "b+", "b+", 2, KeyError])
+        self.assertEqual(self.read(), first)
+
+    def test_eviction(self):
+        expected = self.read()
+        caches = recursive._objpath_cache, recursive._itempath_cache
+        try:
+            recursive._objpath_cache = _LRUCache(2)
+            recursive._itempath_cache = _LRUCache(2)
+            for i in range(3):
+                self.assertEqual(self.read(), expected)
+        finally:
+            recursive._objpath_cache, recursive._itempath_cache = caches
+
+
+class InstanceMakerTest(unittest.TestCase):
+    def test_shared_classes(self):
+        P0 = _tree()
+        p0 = P0()
+        self.assertIs(type(p0.p00), type(P0().p00))
+        self.assertEqual(len(P0.P00.__subclasses__()), 1)
+
+    def test_independent_instances(self):
+        P0 = _tree()
+        p0 = P0()
+        a, b = p0(), p0()
+        a.p00["fmt"] = "r-"
+        self.assertEqual((a.p00["fmt"], b.p00["fmt"], p0.p00["fmt"]),
+                         ("r-", "b+", "b+"))
+
+    def test_collected(self):
+        P0 = _tree()
+        refs = []
+        for i in range(20):
+            p = P0()
+            p.p00["x"] = i
+            refs.append(weakref.ref(p))
+        del p
+        gc.collect()
+        self.assertEqual([r for r in refs if r() is not None], [])
+
+
+def footprint(make, n=500):
+    """ the bytes of the new objects made by make() """
+    gc.collect()
+    before = set(id(o) for o in gc.get_objects())
+    keep = [make() for i in range(n)]
+    new = [o for o in gc.get_objects() if id(o) not in before and o is not keep]
+    return sum(sys.getsizeof(o) for o in new)//n
+
+
+class SlotsTest(unittest.TestCase):
+    def test_no_dict(self):
+        P0 = _tree()
+        p0 = P0()
+        for k in recursive._INSTANCE_SLOTS:
+            self.assertNotIn(k, p0.p00.__dict__)
+        for obj in [p0.p00._history, _History_((None, None), (None, None)),
+                    RecFuncIterator(None, [], {})]:
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_footprint(self):
+        P0 = _tree()
+        p0 = P0()
+        # an instance and its children, about 6.4kB since the slotted
+        # layout, 10kB before
+        self.assertLess(footprint(p0), 8000)
+
+
+class AliasMemoTest(unittest.TestCase):
+    def test_hits(self):
+        P0 = _tree()
+        ma = alias(lambda p: [p["a"], p.get("b", 0)], memo=True)
+        mo = P0()
+        mo.update(a=1, s=ma)
+        for i in range(3):
+            self.assertEqual(mo.p00["s"], [1, 0])
+        self.assertEqual((ma.misses, ma.hits), (1, 2))
+        mo["b"] = 2
+        self.assertEqual(mo.p00["s"], [1, 2])
+        mo.p00["a"] = 3
+        self.assertEqual((mo.p00["s"], mo["s"]), ([3, 2], [1, 2]))
+
+    def test_freed_with_the_object(self):
+        class Value(list):
+            pass
+        P0 = _tree()
+        value = Value([1, 2])
+        ref = weakref.ref(value)
+        mo = P0()
+        mo.update(v=value, s=alias(lambda p: p["v"], memo=True))
+        self.assertIs(mo["s"], value)
+        del mo, value
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_forget(self):
+        P0 = _tree()
+        ml = alias(lambda p: sum(p["l"]), memo=True)
+        mo = P0()
+        mo.update(l=[1, 2], t=ml)
+        self.assertEqual(mo["t"], 3)
+        mo["l"].append(3)
+        self.assertEqual(mo["t"], 3)
+        ml.forget()
+        self.assertEqual(mo["t"], 6)
+
+    def test_opaque(self):
+        P0 = _tree()
+        calls = []
+        def func(p):
+            calls.append(1)
+            return p.locals.get("a")
+        mo = P0()
+        mo.update(a=1, s=alias(func, memo=True))
+        self.assertEqual((mo["s"], mo["s"]), (1, 1))
+        self.assertEqual(len(calls), 2)
+
+
+class BulkResolveTest(_CacheSwitch):
+    def test_resolve(self):
+        P0 = _tree()
+        p0 = P0()
+        p0.update(color="red", y=alias("color"))
+        p00 = p0.p00
+        p00["__inerit__"] = ["color", "y"]
+        keys = KEYS+["y"]
+        for cached in [False, True]:
+            recursive.RESOLUTION_CACHE = cached
+            for o in [p0, p00, p0.p00, p00.p000, p0.p00.p001]:
+                self.assertEqual(o._resolve(keys, "?"),
+                                 [o.get(k, "?") for k in keys])
+            paths = ["p000|style", "p000|color", "p001|notthere"]
+            self.assertEqual(p00._resolve(paths, "?"),
+                             [p00.get(k, "?") for k in paths])
+
+    def test_getargs(self):
+        P0 = _tree()
+        p0 = P0()
+        p0.update(x=1, y=alias("x"))
+        self.assertEqual(p0.p00.getargs("x", "y", "z", z=3), (1, 1, 3))
+        self.assertRaises(KeyError, p0.getargs, "z")
+
+    def test_parseargs(self):
+        P0 = _tree()
+        p0 = P0()
+        p0.update(y=2, color="red")
+        x, y, color, marker = parseargs(p0, (1,), "x", "y", "color", "marker",
+                                        color="blue", marker="+")
+        self.assertEqual((x, y, color, marker), (1, 2, "red", "+"))
+        self.assertEqual(p0["x"], 1)
+        self.assertRaises(TypeError, lambda: list(parseargs(p0, (), "nothere")))
+
+
+class GoPlanTest(unittest.TestCase):
+    def setUp(self):
+        P0 = _tree()
+        class G0(RecObject):
+            f = RecFunc().caller(lambda : 1)
+            p00 = P0.P00()
+            p00.g = RecFunc().caller(lambda : 2)
+        self.G0 = G0
+
+    def test_same_as_go(self):
+        g0 = self.G0()
+        g0["-all"] = ["f", "p00:g", "p00|-x"]
+        g0.p00["-x"] = ["g"]
+        cmds = ("-all; f", "p00.g", ["f", "p00:g"])
+        self.assertEqual(compile_go(*cmds)(g0), g0.go(*cmds))
+
+    def test_any_object(self):
+        plan = compile_go("-all; f", "p00.g")
+        g1 = self.G0()
+        g1["-all"] = ["f"]
+        self.assertEqual(sorted(plan(g1)), [".f", ".p00.g"])
+        g2 = self.G0()
+        g2["-all"] = []
+        self.assertEqual(sorted(plan(g2)), [".f", ".p00.g"])
+
+    def test_error_at_execution(self):
+        plan = compile_go("f", "notthere")
+        self.assertRaises(Exception, plan, self.G0())
+
+
+class GoExecutorTest(unittest.TestCase):
+    def setUp(self):
+        log = self.log = []
+        state = self.state = {"x": 1}
+        def record(name):
+            log.append((name, threading.current_thread()))
+        class F(PlotFactory):
+            @staticmethod
+            def finit(plot):
+                record("compute %d"%state["x"])
+                plot.goifgo()
+            draw = RecFunc().caller(lambda : record("draw"))
+        class G0(RecObject):
+            f = F()
+            f2 = F()
+            prepare = RecFunc().caller(lambda : state.update(x=2))
+            g = RecFunc().caller(lambda : record("g"))
+        G0.f["go"] = G0.f2["go"] = ["draw"]
+        self.G0 = G0
+
+    def test_threads(self):
+        cmds = ("f", "prepare", "f2:draw", "g")
+        output = self.G0().go(*cmds)
+        names = [name for name, _ in self.log]
+        self.state["x"] = 1
+        del self.log[:]
+        main = threading.current_thread()
+        self.assertEqual(self.G0().go(*cmds, executor=2), output)
+        # same calls in the same order, f2 is computed after prepare, only
+        # the init functions run in the pool threads
+        self.assertEqual([name for name, _ in self.log], names)
+        self.assertEqual([thread is main for _, thread in self.log],
+                         [False, True, False, True, True, True])
+
+    def test_pool(self):
+        from multiprocessing.pool import ThreadPool
+        plan = compile_go("f; f2", "g")
+        pool = ThreadPool(2)
+        try:
+            self.assertEqual(plan(self.G0(), pool), plan(self.G0()))
+        finally:
+            pool.close()
+        self.assertEqual([name for name, _ in self.log].count("compute 1"), 4)
+
+
+class AllTest(unittest.TestCase):
+    def test_dict(self):
+        P0 = _tree()
+        p0 = P0()
+        p0["color"] = "red"
+        all = p0.p00.all
+        self.assertIsInstance(all, dict)
+        self.assertEqual((all["color"], all["fmt"]), ("red", "b+"))
+        all["color"] = "blue"
+        self.assertEqual(p0.p00["color"], "red")
+        p0["new"] = 1
+        self.assertNotIn("new", all)
+        self.assertIn("new", p0.p00.all)
+
+    def test_inerit(self):
+        P0 = _tree()
+        p0 = P0()
+        p0.update(color="red", marker="+")
+        p00 = p0.p00
+        p00["__inerit__"] = ["color"]
+        all = p00.all
+        self.assertEqual((all.get("color"), "marker" in all), ("red", False))
+
+
+class CycleIndexTest(unittest.TestCase):
+    def test_reset(self):
+        P0 = _tree()
+        cy = P0()
+        cy["c"] = cycle([1, 2])
+        next(cy["c"])
+        cy2 = cy.derive()
+        cy2.reset()
+        self.assertEqual(next(cy2["c"]), 1)
+        self.assertIn("c", cy2.locals)
+
+    def test_index(self):
+        params = _Params(a=cycle([1]), b=1)
+        self.assertEqual(params.cycles, set(["a"]))
+        params.update([("c", loop([1])), ("b", cycle([2]))], d=2)
+        self.assertEqual(params.cycles, set(["a", "b", "c"]))
+        params.update(a=0)
+        params["c"] = 1
+        del params["b"]
+        self.assertEqual(params.cycles, set())
+        params.setdefault("e", cycle([1]))
+        self.assertEqual(params.pop("e") is not None, True)
+        self.assertEqual(params.cycles, set())
+
+
+if __name__ == "__main__":
+    unittest.main()